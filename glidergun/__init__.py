@@ -1,4 +1,5 @@
 # ruff: noqa: F401
+from glidergun._automaton import CellularAutomaton
 from glidergun._display import animate
 from glidergun._grid import (
     Grid,
@@ -14,8 +15,12 @@ from glidergun._grid import (
     standardize,
     std,
 )
+from glidergun._lazy import LazyGrid
 from glidergun._literals import BaseMap, ColorMap, DataType, ResamplingMethod
 from glidergun._mosaic import Mosaic, mosaic
 from glidergun._prediction import load_model
+from glidergun._pyramid import TilePyramid
 from glidergun._stack import Stack, stack
+from glidergun._tiling import process_tiles
 from glidergun._types import CellSize, Defaults, Extent, PointValue
+from glidergun._zonal import ZonalStatistics
@@ -0,0 +1,152 @@
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, FrozenSet, Iterator, List, Optional, Tuple, cast
+
+import numpy as np
+from numpy import ndarray
+
+if TYPE_CHECKING:
+    from glidergun._grid import Grid
+
+
+@dataclass(frozen=True)
+class Automaton:
+    def automaton(
+        self, rule: str = "B3/S23", wrap: bool = False
+    ) -> "CellularAutomaton":
+        return CellularAutomaton(cast("Grid", self), rule, wrap)
+
+    def simulate(
+        self,
+        generations: Optional[int] = None,
+        rule: str = "B3/S23",
+        wrap: bool = False,
+        every: int = 1,
+    ) -> Iterator["Grid"]:
+        """Runs a cellular automaton seeded with the non-zero cells of this grid.
+
+        Args:
+            generations: Number of generations to run.  Runs indefinitely if None.
+            rule: Birth/survival rule such as 'B3/S23' (Conway's Game of Life).
+            wrap: Whether edges wrap around (toroidal) instead of being dead.
+            every: Yields one frame for every this many generations.
+
+        Returns:
+            Iterator[Grid]: Boolean grids, starting with the seed, produced lazily.
+        """
+        return self.automaton(rule, wrap).frames(generations, every)
+
+
+class CellularAutomaton:
+    def __init__(self, grid: "Grid", rule: str = "B3/S23", wrap: bool = False):
+        self.born, self.survive = _parse_rule(rule)
+        self.wrap = wrap
+        self.generation = 0
+        self._template = grid
+        self._born = _terms(self.born)
+        self._survive = _terms(self.survive)
+        self._last = np.uint64((grid.width - 1) % 64)
+        self._mask = np.full(-(-grid.width // 64), ~np.uint64(0))
+        self._mask[-1] >>= np.uint64(63 - (grid.width - 1) % 64)
+        data = grid.data
+        self._state = _pack(np.isfinite(data) & (data != 0))
+
+    @property
+    def grid(self) -> "Grid":
+        bits = np.unpackbits(self._state.view("uint8"), axis=1, bitorder="little")
+        return self._template.local(bits[:, : self._template.width].astype("bool"))
+
+    @property
+    def population(self) -> int:
+        return int(np.bitwise_count(self._state).sum())
+
+    def step(self, generations: int = 1) -> "CellularAutomaton":
+        for _ in range(generations):
+            self._state = self._next(self._state)
+        self.generation += generations
+        return self
+
+    def frames(
+        self, generations: Optional[int] = None, every: int = 1
+    ) -> Iterator["Grid"]:
+        yield self.grid
+        count = 0
+        while generations is None or count < generations:
+            n = every if generations is None else min(every, generations - count)
+            count += n
+            yield self.step(n).grid
+
+    def _next(self, x: ndarray) -> ndarray:
+        up, down = np.zeros_like(x), np.zeros_like(x)
+        if self.wrap:
+            up[:] = np.roll(x, 1, axis=0)
+            down[:] = np.roll(x, -1, axis=0)
+        else:
+            up[1:], down[:-1] = x[:-1], x[1:]
+
+        neighbours = [up, down]
+        for row in (up, x, down):
+            neighbours.append(self._west(row))
+            neighbours.append(self._east(row))
+
+        s0, s1, s2, s3 = _count(neighbours)
+        bits = (s0, s1, s2, s3, ~s0, ~s1, ~s2, ~s3)
+        born = _match(self._born, bits, x)
+        survive = _match(self._survive, bits, x)
+        return ((~x & born) | (x & survive)) & self._mask
+
+    def _west(self, x: ndarray) -> ndarray:
+        result = x << np.uint64(1)
+        result[:, 1:] |= x[:, :-1] >> np.uint64(63)
+        if self.wrap:
+            result[:, 0] |= (x[:, -1] >> self._last) & np.uint64(1)
+        return result
+
+    def _east(self, x: ndarray) -> ndarray:
+        result = x >> np.uint64(1)
+        result[:, :-1] |= x[:, 1:] << np.uint64(63)
+        if self.wrap:
+            result[:, -1] |= (x[:, 0] & np.uint64(1)) << self._last
+        return result
+
+
+def _parse_rule(rule: str) -> Tuple[FrozenSet[int], FrozenSet[int]]:
+    text = rule.upper().replace(" ", "")
+    if match := re.fullmatch(r"B([0-8]*)/S([0-8]*)", text):
+        born, survive = match.groups()
+    elif match := re.fullmatch(r"S([0-8]*)/B([0-8]*)", text):
+        survive, born = match.groups()
+    else:
+        raise ValueError(f"Invalid rule '{rule}'.  Expected a rule like 'B3/S23'.")
+    return frozenset(map(int, born)), frozenset(map(int, survive))
+
+
+def _terms(counts: FrozenSet[int]) -> List[Tuple[int, ...]]:
+    return [tuple(i if k >> i & 1 else i + 4 for i in range(4)) for k in counts]
+
+
+def _pack(alive: ndarray) -> ndarray:
+    height, width = alive.shape
+    padded = np.zeros((height, -(-width // 64) * 64), dtype="bool")
+    padded[:, :width] = alive
+    return np.packbits(padded, axis=1, bitorder="little").view("<u8")
+
+
+def _count(neighbours: List[ndarray]) -> Tuple[ndarray, ndarray, ndarray, ndarray]:
+    s0 = neighbours[0].copy()
+    s1, s2, s3 = np.zeros_like(s0), np.zeros_like(s0), np.zeros_like(s0)
+    for n in neighbours[1:]:
+        c0 = s0 & n
+        s0 ^= n
+        c1 = s1 & c0
+        s1 ^= c0
+        s3 |= s2 & c1
+        s2 ^= c1
+    return s0, s1, s2, s3
+
+
+def _match(terms: List[Tuple[int, ...]], bits: Tuple[ndarray, ...], x: ndarray):
+    result = np.zeros_like(x)
+    for term in terms:
+        result |= bits[term[0]] & bits[term[1]] & bits[term[2]] & bits[term[3]]
+    return result
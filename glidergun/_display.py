@@ -1,12 +1,16 @@
+import sys
 from base64 import b64encode
-from typing import Any, Iterable, Optional, Union
+from collections.abc import Sized
+from itertools import chain, islice
+from typing import Any, Iterable, Optional, Union, overload
 
 import IPython
 import matplotlib.pyplot as plt
-from matplotlib.animation import ArtistAnimation
+from matplotlib.animation import Animation, FuncAnimation
 
 from glidergun._grid import Grid
 from glidergun._literals import ColorMap
+from glidergun._pyramid import TilePyramid
 from glidergun._stack import Stack
 from glidergun._types import Extent
 
@@ -19,24 +23,51 @@ def get_folium_map(
     height: int,
     attribution: Optional[str],
     grayscale: bool = True,
+    tiles: bool = False,
     **kwargs,
 ):
     import folium
     import jinja2
 
-    obj_4326 = obj.project(4326)
-
-    extent = Extent(
-        obj_4326.xmin, max(obj_4326.ymin, -85), obj_4326.xmax, min(obj_4326.ymax, 85)
-    )
-
-    if obj_4326.extent != extent:
-        obj_4326 = obj_4326.clip(*extent)
-
-    obj_3857 = obj_4326.project(3857)
+    if tiles:
+        pyramid = TilePyramid.cached(obj)
+        xmin, ymin, xmax, ymax = pyramid.bounds
+        bounds = [[ymin, xmin], [ymax, xmax]]
+        layer = folium.TileLayer(
+            pyramid.serve(),
+            attr="glidergun",
+            overlay=True,
+            opacity=opacity,
+            min_zoom=0,
+            max_native_zoom=pyramid.max_zoom,
+            max_zoom=max(pyramid.max_zoom, 18),
+        )
+    else:
+        obj_4326 = obj.project(4326)
+
+        extent = Extent(
+            obj_4326.xmin,
+            max(obj_4326.ymin, -85),
+            obj_4326.xmax,
+            min(obj_4326.ymax, 85),
+        )
+
+        if obj_4326.extent != extent:
+            obj_4326 = obj_4326.clip(*extent)
+
+        obj_3857 = obj_4326.project(3857)
+        xmin, ymin, xmax, ymax = obj_4326.extent
+        bounds = [[ymin, xmin], [ymax, xmax]]
+
+        color: Any = obj.display
+        image = b64encode(obj_3857.color(color)._thumbnail((20, 20))).decode()
+        layer = folium.raster_layers.ImageOverlay(  # type: ignore
+            image=f"data:image/png;base64, {image}",
+            bounds=bounds,
+            opacity=opacity,
+        )
 
     figure = folium.Figure(width=str(width), height=str(height))
-    bounds = [[obj_4326.ymin, obj_4326.xmin], [obj_4326.ymax, obj_4326.xmax]]
 
     if isinstance(basemap, str) or basemap is None:
         if basemap:
@@ -74,43 +105,108 @@ def get_folium_map(
     else:
         folium_map = basemap
 
-    color: Any = obj.display
-
-    folium.raster_layers.ImageOverlay(  # type: ignore
-        image=f"data:image/png;base64, {b64encode(obj_3857.color(color)._thumbnail((20, 20))).decode()}",
-        bounds=bounds,
-        opacity=opacity,
-    ).add_to(folium_map)
+    layer.add_to(folium_map)
 
     return folium_map
 
 
-def get_html(obj: Union[Grid, Stack, ArtistAnimation]):
-    if isinstance(obj, ArtistAnimation):
+def get_html(obj: Union[Grid, Stack, Animation]):
+    if isinstance(obj, Animation):
         return f"<div>{obj.to_jshtml()}</div>"
     description = str(obj).replace("|", "<br />")
     return f'<div><div>{description}</div><img src="{obj.img}" /><div>{obj.extent}</div></div>'
 
 
+@overload
 def animate(
     grids: Iterable[Grid],
     cmap: Union[ColorMap, Any] = "gray",
     interval: int = 100,
-):
-    first = next(iter(grids))
-    n = 5 / first.width
-    figsize = (first.width * n, first.height * n)
+    every: int = 1,
+    frames: Optional[int] = None,
+    downsample: bool = True,
+    file: None = None,
+) -> FuncAnimation: ...
+
+
+@overload
+def animate(
+    grids: Iterable[Grid],
+    cmap: Union[ColorMap, Any] = "gray",
+    interval: int = 100,
+    every: int = 1,
+    frames: Optional[int] = None,
+    downsample: bool = True,
+    *,
+    file: str,
+) -> None: ...
 
-    def iterate():
-        yield first
-        yield from grids
 
-    figure = plt.figure(figsize=figsize, frameon=False)
+def animate(
+    grids: Iterable[Grid],
+    cmap: Union[ColorMap, Any] = "gray",
+    interval: int = 100,
+    every: int = 1,
+    frames: Optional[int] = None,
+    downsample: bool = True,
+    file: Optional[str] = None,
+):
+    """Creates an animation that renders grids one frame at a time.
+
+    Args:
+        grids: Grids to animate.  Generators are consumed lazily.
+        cmap: Color map.
+        interval: Delay between frames in milliseconds.
+        every: Renders one frame for every this many grids.
+        frames: Maximum number of frames to render.  Defaults to every grid;
+            required for unbounded iterables such as ``simulate()`` without
+            ``generations``, which would otherwise be rendered forever.
+        downsample: Whether to decimate grids larger than the figure resolution.
+        file: If set, encodes the animation to this file (e.g. .gif or .mp4)
+            without keeping frames in memory, and returns None.
+
+    Returns:
+        FuncAnimation: Animation, unless ``file`` is set.
+    """
+    if frames is None and isinstance(grids, Sized):
+        frames = -(-len(grids) // every)
+
+    iterator = islice(iter(grids), 0, frames and frames * every, every)
+    first = next(iterator)
+    n = 5 / first.width
+    figure = plt.figure(figsize=(first.width * n, first.height * n), frameon=False)
     axes = figure.add_axes((0, 0, 1, 1))
     axes.axis("off")
-    frames = [[plt.imshow(g.data, cmap=cmap, animated=True)] for g in iterate()]
+    step = max(1, -(-max(first.width, first.height) // int(5 * figure.dpi)))
+    step = step if downsample else 1
+
+    def render(grid: Grid):
+        return grid.data[::step, ::step]
+
+    image = axes.imshow(render(first), cmap=cmap, animated=True)
     plt.close()
-    return ArtistAnimation(figure, frames, interval=interval, blit=True)
+
+    def update(grid: Grid):
+        image.set_data(render(grid))
+        image.autoscale()
+        return (image,)
+
+    animation = FuncAnimation(
+        figure,
+        update,  # type: ignore
+        chain([first], iterator),
+        lambda: (image,),
+        interval=interval,
+        blit=True,
+        save_count=sys.maxsize if frames is None else frames,
+        cache_frame_data=False,
+    )
+
+    if file is None:
+        return animation
+
+    writer = "pillow" if file.lower().endswith(".gif") else None
+    animation.save(file, writer, fps=1000 / interval)  # type: ignore
 
 
 if ipython := IPython.get_ipython():  # type: ignore
@@ -118,7 +214,7 @@ if ipython := IPython.get_ipython():  # type: ignore
     formatter = formatters["text/html"]
     formatter.for_type(Grid, get_html)
     formatter.for_type(Stack, get_html)
-    formatter.for_type(ArtistAnimation, get_html)
+    formatter.for_type(Animation, get_html)
     formatter.for_type(
         tuple,
         lambda items: (
@@ -1,9 +1,24 @@
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any, Callable, List, Union, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Union,
+    cast,
+)
 
 import numpy as np
 from numpy import ndarray
 from numpy.lib.stride_tricks import sliding_window_view
+from scipy import ndimage
+from scipy.signal import oaconvolve
+
+from glidergun._literals import ConvolutionBackend, ConvolutionMode, ExecutorType
+from glidergun._types import Defaults
 
 if TYPE_CHECKING:
     from glidergun._grid import Grid
@@ -17,33 +32,177 @@ class Focal:
         buffer: int,
         circle: bool,
         max_workers: int,
+        executor: ExecutorType = "thread",
+        chunk_size: Optional[int] = None,
     ) -> "Grid":
         grid = cast("Grid", self)
+        size = 2 * buffer + 1
+        mask = _mask(buffer) if circle else np.full((size, size), True)
 
         def f(g: "Grid") -> "Grid":
-            size = 2 * buffer + 1
-            mask = _mask(buffer) if circle else np.full((size, size), True)
             array = sliding_window_view(_pad(g.data, buffer), (size, size))
-            result = func(array[:, :, mask])
+            rows = chunk_size or max(1, Defaults.block_size // (g.width * mask.sum()))
+            if rows >= g.height:
+                return g.local(func(array[:, :, mask]))
+            chunks = [
+                func(array[i : i + rows][:, :, mask]) for i in range(0, g.height, rows)
+            ]
+            return g.local(np.concatenate(chunks))
+
+        tile_size = 8000 // buffer
+        if max_workers > 1:
+            tile_size = min(tile_size, -(-max(grid.width, grid.height) // max_workers))
+        return grid.process_tiles(f, tile_size, buffer, max_workers, executor)
+
+    def convolve(
+        self,
+        kernel: ndarray,
+        mode: ConvolutionMode = "normalize",
+        backend: ConvolutionBackend = "auto",
+        max_workers: int = 1,
+        executor: ExecutorType = "thread",
+    ) -> "Grid":
+        weights = np.asarray(kernel, dtype="float64")
+
+        if weights.ndim != 2 or not all(n % 2 for n in weights.shape):
+            raise ValueError("Kernel must be a 2-D array with odd dimensions.")
+
+        method = _convolution_backend(weights, backend)
+        total = np.abs(weights).sum()
+        buffer = max(weights.shape) // 2
+
+        def f(g: "Grid") -> "Grid":
+            data = np.asarray(g.data, dtype="float64")
+            valid = ~np.isnan(data)
+            result = _convolve(np.where(valid, data, 0), weights, method)
+            if mode == "zero":
+                return g.local(result)
+            coverage = _convolve(valid.astype("float64"), np.abs(weights), method)
+            if mode == "propagate":
+                result[coverage < total * (1 - 1e-9)] = np.nan
+            else:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    result *= total / coverage
+                result[coverage <= total * 1e-9] = np.nan
             return g.local(result)
 
-        return grid.process_tiles(f, 8000 // buffer, buffer, max_workers)
+        return self._focal_tiles(f, buffer, max_workers, executor)
+
+    def _focal_tiles(
+        self,
+        func: Callable[["Grid"], "Grid"],
+        buffer: int,
+        max_workers: int,
+        executor: ExecutorType = "thread",
+    ) -> "Grid":
+        grid = cast("Grid", self)
+        tile_size = max(2048, 8 * buffer)
+        if max_workers > 1:
+            tile_size = min(tile_size, -(-max(grid.width, grid.height) // max_workers))
+        return grid.process_tiles(func, tile_size, buffer, max_workers, executor)
+
+    def _focal_summed_area(
+        self,
+        statistic: Literal["sum", "mean", "var", "std"],
+        buffer: int,
+        ignore_nan: bool,
+        max_workers: int,
+    ) -> "Grid":
+        def f(g: "Grid") -> "Grid":
+            data = np.asarray(g.data, dtype="float64")
+            valid = ~np.isnan(data)
+            count = _window_sum(valid, buffer)
+            shift = (
+                float(data[valid].mean())
+                if statistic in ("var", "std") and valid.any()
+                else 0.0
+            )
+            values = np.where(valid, data - shift, 0.0)
+            total = _window_sum(values, buffer)
+
+            if statistic == "sum":
+                result = total
+            else:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    mean = total / count
+                    if statistic == "mean":
+                        result = mean + shift
+                    else:
+                        values *= values
+                        result = _window_sum(values, buffer) / count - mean * mean
+                        np.maximum(result, 0.0, out=result)
+                        result[count == 1] = 0.0
+                        if statistic == "std":
+                            np.sqrt(result, out=result)
+                result[count == 0] = np.nan
+
+            if not ignore_nan:
+                result[count < (2 * buffer + 1) ** 2] = np.nan
+
+            return g.local(result)
+
+        return self._focal_tiles(f, buffer, max_workers)
 
     def focal_generic(
         self,
-        func: Callable[[List[float]], float],
+        func: Union[
+            Callable[[List[float]], float], Callable[[ndarray], ndarray], np.ufunc
+        ],
         buffer: int = 1,
         circle: bool = False,
         ignore_nan: bool = True,
         max_workers: int = 1,
+        executor: ExecutorType = "thread",
+        vectorized: bool = False,
+        chunk_size: Optional[int] = None,
     ) -> "Grid":
-        def f(a):
-            values = [n for n in a if n != np.nan] if ignore_nan else list(a)
-            return func(values)
+        """Applies a custom function to the neighbourhood of every cell.
 
-        return self.focal(
-            lambda a: np.apply_along_axis(f, 2, a), buffer, circle, max_workers
-        )
+        Args:
+            func: By default, a function that reduces the list of values in one
+                window to a number.  With ``vectorized=True``, a function that
+                takes a ``(rows, cols, window)`` block and reduces the last axis,
+                e.g. ``lambda a: np.percentile(a, 90, axis=2)``.  A binary NumPy
+                ufunc such as ``np.maximum`` is applied with ``ufunc.reduce``.
+            buffer: Window radius in cells.
+            circle: Whether to use a circular window.
+            ignore_nan: Whether to skip NaN values.  For vectorized functions,
+                NaN is still passed in, but cells with no valid neighbours are
+                NaN; otherwise any NaN in the window makes the cell NaN.
+            max_workers: Number of tiles processed in parallel.
+            executor: Executor type used for parallel tiles.
+            vectorized: Whether ``func`` operates on whole blocks.
+            chunk_size: Number of rows passed to ``func`` at a time.  Defaults
+                to a size that bounds the memory used by the window block.
+
+        Returns:
+            Grid: The result of the function.
+        """
+        if isinstance(func, np.ufunc):
+            func, vectorized = _reduction(func, ignore_nan), True
+
+        if vectorized:
+            reduce = cast(Callable[[ndarray], ndarray], func)
+
+            def f(a: ndarray) -> ndarray:
+                result = reduce(a)
+                nan = np.isnan(a)
+                invalid = nan.all(axis=2) if ignore_nan else nan.any(axis=2)
+                return np.where(invalid, np.nan, result) if invalid.any() else result
+
+        else:
+            apply = cast(Callable[[List[float]], float], func)
+
+            def g(a: ndarray):
+                if not ignore_nan:
+                    return apply(list(a))
+                values = a[~np.isnan(a)]
+                return apply(list(values)) if values.size else np.nan
+
+            def f(a: ndarray) -> ndarray:
+                return np.apply_along_axis(g, 2, a)
+
+        return self.focal(f, buffer, circle, max_workers, executor, chunk_size)
 
     def focal_count(
         self,
@@ -53,6 +212,12 @@ class Focal:
         max_workers: int = 1,
         **kwargs,
     ):
+        if _summed_area_applies(self, circle, kwargs):
+            return self._focal_tiles(
+                lambda g: g.local(_window_sum(g.data == value, buffer)),
+                buffer,
+                max_workers,
+            )
         return self.focal(
             lambda a: np.count_nonzero(a == value, axis=2, **kwargs),
             buffer,
@@ -60,9 +225,68 @@ class Focal:
             max_workers,
         )
 
+    def _focal_extreme(
+        self,
+        statistic: Literal["min", "max", "ptp"],
+        buffer: int,
+        ignore_nan: bool,
+        max_workers: int,
+    ) -> "Grid":
+        def f(g: "Grid") -> "Grid":
+            data = np.asarray(g.data, dtype="float32")
+            count = _window_sum(~np.isnan(data), buffer)
+
+            if statistic == "ptp":
+                result = _van_herk(data, buffer, np.maximum, -np.inf)
+                result -= _van_herk(data, buffer, np.minimum, np.inf)
+            elif statistic == "min":
+                result = _van_herk(data, buffer, np.minimum, np.inf)
+            else:
+                result = _van_herk(data, buffer, np.maximum, -np.inf)
+
+            if ignore_nan:
+                result[count == 0] = np.nan
+            else:
+                result[count < (2 * buffer + 1) ** 2] = np.nan
+
+            return g.local(result)
+
+        return self._focal_tiles(f, buffer, max_workers)
+
+    def _focal_quantized_median(
+        self, buffer: int, ignore_nan: bool, levels: ndarray, max_workers: int
+    ) -> "Grid":
+        def f(g: "Grid") -> "Grid":
+            data = np.asarray(g.data, dtype="float32")
+            count = _window_sum(~np.isnan(data), buffer)
+            ranks = ((count - 1) // 2 + 1, count // 2 + 1)
+            lower = np.full(data.shape, np.nan, dtype="float32")
+            upper = np.full(data.shape, np.nan, dtype="float32")
+            cumulative = np.zeros(data.shape, dtype="int64")
+            pending = count > 0
+
+            for level in levels:
+                cumulative += _window_sum(data == level, buffer)
+                for median, rank in zip((lower, upper), ranks):
+                    median[pending & np.isnan(median) & (cumulative >= rank)] = level
+                pending &= np.isnan(upper)
+                if not pending.any():
+                    break
+
+            result = (lower + upper) / np.float32(2)
+
+            if not ignore_nan:
+                result[count < (2 * buffer + 1) ** 2] = np.nan
+
+            return g.local(result)
+
+        return self._focal_tiles(f, buffer, max_workers)
+
     def focal_ptp(
         self, buffer: int = 1, circle: bool = False, max_workers: int = 1, **kwargs
     ):
+        if not circle and not kwargs:
+            return self._focal_extreme("ptp", buffer, False, max_workers)
         return self.focal(
             lambda a: np.ptp(a, axis=2, **kwargs), buffer, circle, max_workers
         )
@@ -75,6 +299,12 @@ class Focal:
         max_workers: int = 1,
         **kwargs,
     ):
+        if not circle and not kwargs:
+            levels = _levels(self, buffer)
+            if levels is not None:
+                return self._focal_quantized_median(
+                    buffer, ignore_nan, levels, max_workers
+                )
         f = np.nanmedian if ignore_nan else np.median
         return self.focal(lambda a: f(a, axis=2, **kwargs), buffer, circle, max_workers)
 
@@ -86,6 +316,8 @@ class Focal:
         max_workers: int = 1,
         **kwargs,
     ):
+        if _summed_area_applies(self, circle, kwargs):
+            return self._focal_summed_area("mean", buffer, ignore_nan, max_workers)
         f = np.nanmean if ignore_nan else np.mean
         return self.focal(lambda a: f(a, axis=2, **kwargs), buffer, circle, max_workers)
 
@@ -97,6 +329,8 @@ class Focal:
         max_workers: int = 1,
         **kwargs,
     ):
+        if _summed_area_applies(self, circle, kwargs):
+            return self._focal_summed_area("std", buffer, ignore_nan, max_workers)
         f = np.nanstd if ignore_nan else np.std
         return self.focal(lambda a: f(a, axis=2, **kwargs), buffer, circle, max_workers)
 
@@ -108,6 +342,8 @@ class Focal:
         max_workers: int = 1,
         **kwargs,
     ):
+        if _summed_area_applies(self, circle, kwargs):
+            return self._focal_summed_area("var", buffer, ignore_nan, max_workers)
         f = np.nanvar if ignore_nan else np.var
         return self.focal(lambda a: f(a, axis=2, **kwargs), buffer, circle, max_workers)
 
@@ -119,6 +355,8 @@ class Focal:
         max_workers: int = 1,
         **kwargs,
     ):
+        if not circle and not kwargs:
+            return self._focal_extreme("min", buffer, ignore_nan, max_workers)
         f = np.nanmin if ignore_nan else np.min
         return self.focal(lambda a: f(a, axis=2, **kwargs), buffer, circle, max_workers)
 
@@ -130,6 +368,8 @@ class Focal:
         max_workers: int = 1,
         **kwargs,
     ):
+        if not circle and not kwargs:
+            return self._focal_extreme("max", buffer, ignore_nan, max_workers)
         f = np.nanmax if ignore_nan else np.max
         return self.focal(lambda a: f(a, axis=2, **kwargs), buffer, circle, max_workers)
 
@@ -141,6 +381,8 @@ class Focal:
         max_workers: int = 1,
         **kwargs,
     ):
+        if _summed_area_applies(self, circle, kwargs):
+            return self._focal_summed_area("sum", buffer, ignore_nan, max_workers)
         f = np.nansum if ignore_nan else np.sum
         return self.focal(lambda a: f(a, axis=2, **kwargs), buffer, circle, max_workers)
 
@@ -160,6 +402,89 @@ class Focal:
         return grid.process_tiles(f, 256, 2**max_exponent, max_workers)
 
 
+def _summed_area_applies(obj: Any, circle: bool, kwargs: Dict[str, Any]) -> bool:
+    grid = cast("Grid", obj)
+    return not circle and not kwargs and not np.isinf(grid.data).any()
+
+
+def _reduction(func: np.ufunc, ignore_nan: bool) -> Callable[[ndarray], ndarray]:
+    if func.nin != 2 or func.nout != 1:
+        raise ValueError(f"'{func.__name__}' is not a binary ufunc.")
+    if not ignore_nan:
+        return lambda a: func.reduce(a, axis=2)
+    func = {np.maximum: np.fmax, np.minimum: np.fmin}.get(func, func)
+    if func in (np.fmax, np.fmin):
+        return lambda a: func.reduce(a, axis=2)
+    if func.identity is None:
+        raise ValueError(f"'{func.__name__}' has no identity to replace NaN with.")
+    return lambda a: func.reduce(np.where(np.isnan(a), func.identity, a), axis=2)
+
+
+def _convolution_backend(weights: ndarray, backend: ConvolutionBackend) -> str:
+    separable = np.linalg.matrix_rank(weights) == 1
+    if backend == "separable" and not separable:
+        raise ValueError("Kernel is not separable.")
+    if backend != "auto":
+        return backend
+    if separable:
+        return "separable"
+    return "fft" if weights.size > 121 else "direct"
+
+
+def _convolve(data: ndarray, weights: ndarray, method: str) -> ndarray:
+    if method == "fft":
+        return oaconvolve(data, weights, mode="same")
+    if method == "separable":
+        u, s, vt = np.linalg.svd(weights)
+        result = ndimage.convolve1d(data, u[:, 0] * s[0], axis=0, mode="constant")
+        return ndimage.convolve1d(result, vt[0], axis=1, mode="constant")
+    return ndimage.convolve(data, weights, mode="constant")
+
+
+def _levels(obj: Any, buffer: int) -> Optional[ndarray]:
+    data = cast("Grid", obj).data
+    sample = data.ravel()[:: max(1, data.size // 65536)]
+    limit = min(256, (2 * buffer + 1) ** 2 // 2)
+    if len(np.unique(sample[~np.isnan(sample)])) > limit:
+        return None
+    levels = np.unique(data)
+    levels = levels[~np.isnan(levels)]
+    return levels if len(levels) <= limit else None
+
+
+def _van_herk(data: ndarray, buffer: int, func: np.ufunc, fill: float) -> ndarray:
+    size = 2 * buffer + 1
+    result = np.where(np.isnan(data), fill, data)
+    for axis in (0, 1):
+        values = np.moveaxis(result, axis, -1)
+        n = values.shape[-1]
+        padded = np.full(
+            (*values.shape[:-1], -(-(n + 2 * buffer) // size) * size), fill, data.dtype
+        )
+        padded[..., buffer : buffer + n] = values
+        blocks = padded.reshape(*values.shape[:-1], -1, size)
+        prefix = func.accumulate(blocks, axis=-1).reshape(padded.shape)
+        suffix = func.accumulate(blocks[..., ::-1], axis=-1)[..., ::-1]
+        suffix = suffix.reshape(padded.shape)
+        values = func(suffix[..., :n], prefix[..., size - 1 : size - 1 + n])
+        result = np.moveaxis(values, -1, axis)
+    return result
+
+
+def _window_sum(data: ndarray, buffer: int) -> ndarray:
+    size = 2 * buffer + 1
+    result = np.asarray(data, dtype="float64" if data.dtype.kind == "f" else "int64")
+    for axis in (0, 1):
+        padding = [(0, 0), (0, 0)]
+        padding[axis] = (buffer + 1, buffer)
+        cumsum = np.cumsum(np.pad(result, padding), axis=axis)
+        if axis == 0:
+            result = cumsum[size:] - cumsum[:-size]
+        else:
+            result = cumsum[:, size:] - cumsum[:, :-size]
+    return result
+
+
 def _mask(buffer: int) -> ndarray:
     size = 2 * buffer + 1
     rows = []
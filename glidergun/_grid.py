@@ -1,17 +1,19 @@
 import dataclasses
 import hashlib
 from base64 import b64encode
-from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from functools import cached_property
 from io import BytesIO
+from math import ceil
 from types import FunctionType
 from typing import (
     Any,
     Callable,
     Dict,
     Iterable,
+    Iterator,
     List,
+    Literal,
     Optional,
     Sequence,
     Tuple,
@@ -24,7 +26,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 import rasterio
 from matplotlib import patheffects
-from numpy import arctan, arctan2, cos, gradient, ndarray, pi, sin, sqrt
+from numpy import ndarray
 from rasterio import DatasetReader, features
 from rasterio.crs import CRS
 from rasterio.drivers import driver_from_extension
@@ -32,6 +34,8 @@ from rasterio.io import MemoryFile
 from rasterio.transform import Affine, from_bounds
 from rasterio.warp import Resampling, calculate_default_transform, reproject
 from rasterio.windows import Window
+from scipy.ndimage import distance_transform_edt
+from scipy.spatial import cKDTree  # type: ignore
 from scipy.spatial.distance import cdist
 from shapely.geometry import Point, Polygon
 from shapely.geometry.base import BaseGeometry
@@ -40,17 +44,24 @@ from sklearn.decomposition import PCA
 from sklearn.neighbors import KernelDensity
 from sklearn.preprocessing import StandardScaler
 
-from glidergun._focal import Focal
+from glidergun._automaton import Automaton
+from glidergun._focal import Focal, _convolution_backend, _convolve
 from glidergun._interpolation import Interpolation
+from glidergun._lazy import FileSource, LazyGrid
 from glidergun._literals import (
     BaseMap,
     ColorMap,
     DataType,
+    DensityKernel,
+    ExecutorType,
     ExtentResolution,
     ResamplingMethod,
 )
 from glidergun._prediction import Prediction
+from glidergun._rendering import thumbnail
 from glidergun._shapefile import Shapefile
+from glidergun._terrain import Terrain
+from glidergun._tiling import process_tiles
 from glidergun._types import CellSize, Defaults, Extent, GridCore, PointValue, Scaler
 from glidergun._utils import (
     create_directory,
@@ -64,7 +75,9 @@ Operand = Union["Grid", float, int]
 
 
 @dataclass(frozen=True)
-class Grid(GridCore, Interpolation, Prediction, Focal, Zonal, Shapefile):
+class Grid(
+    GridCore, Interpolation, Prediction, Focal, Terrain, Zonal, Shapefile, Automaton
+):
     display: Union[ColorMap, Any] = field(default_factory=lambda: Defaults.display)
 
     def __post_init__(self):
@@ -87,6 +100,14 @@ class Grid(GridCore, Interpolation, Prediction, Focal, Zonal, Shapefile):
     def _thumbnail(
         self, figsize: Optional[Tuple[float, float]] = None, show_values: bool = False
     ):
+        if not (
+            show_values
+            and self.dtype != "bool"
+            and self.width <= Defaults.annotation_threshold
+            and self.height <= Defaults.annotation_threshold
+        ):
+            return thumbnail(self.data, self.display, figsize)
+
         with BytesIO() as buffer:
             figure = plt.figure(figsize=figsize, frameon=False)
             axes = figure.add_axes((0, 0, 1, 1))
@@ -94,26 +115,20 @@ class Grid(GridCore, Interpolation, Prediction, Focal, Zonal, Shapefile):
             obj = self.to_uint8_range()
             plt.imshow(obj.data, cmap=self.display)
 
-            if (
-                show_values
-                and self.dtype != "bool"
-                and self.width <= Defaults.annotation_threshold
-                and self.height <= Defaults.annotation_threshold
-            ):
-                for row in range(self.height):
-                    for column in range(self.width):
-                        value = self.data[row][column]
-                        plt.annotate(
-                            str(round(value, 2)),
-                            xy=(column + 0.02, row + 0.02),
-                            ha="center",
-                            va="center",
-                            color="white",
-                            fontsize=9,
-                            path_effects=[
-                                patheffects.withStroke(linewidth=1, foreground="black")
-                            ],
-                        )
+            for row in range(self.height):
+                for column in range(self.width):
+                    value = self.data[row][column]
+                    plt.annotate(
+                        str(round(value, 2)),
+                        xy=(column + 0.02, row + 0.02),
+                        ha="center",
+                        va="center",
+                        color="white",
+                        fontsize=9,
+                        path_effects=[
+                            patheffects.withStroke(linewidth=1, foreground="black")
+                        ],
+                    )
 
             plt.savefig(buffer, bbox_inches="tight", pad_inches=0)
             plt.close(figure)
@@ -324,7 +339,10 @@ class Grid(GridCore, Interpolation, Prediction, Focal, Zonal, Shapefile):
             return n.data
         return n
 
-    def _apply(self, left: Operand, right: Operand, op: Callable):
+    def _apply(self, left: Operand, right: Operand, op: Callable) -> "Grid":
+        if isinstance(left, LazyGrid) or isinstance(right, LazyGrid):
+            return NotImplemented
+
         if not isinstance(left, Grid) or not isinstance(right, Grid):
             return self.local(op(self._data(left), self._data(right)))
 
@@ -339,6 +357,9 @@ class Grid(GridCore, Interpolation, Prediction, Focal, Zonal, Shapefile):
         data = func if isinstance(func, ndarray) else func(self.data)
         return grid(data, self.transform, self.crs)
 
+    def lazy(self) -> LazyGrid:
+        return LazyGrid(self)
+
     def mosaic(self, *grids: "Grid"):
         grids_adjusted = standardize(self, *grids, extent="union")
         result = grids_adjusted[0]
@@ -507,31 +528,146 @@ class Grid(GridCore, Interpolation, Prediction, Focal, Zonal, Shapefile):
 
     def density(
         self,
-        points: Optional[Sequence[Tuple[float, float]]] = None,
+        points: Union[Sequence[Tuple[float, float]], ndarray, None] = None,
         max_workers: int = 1,
+        bandwidth: float = 1.0,
+        kernel: DensityKernel = "gaussian",
+        weights: Union[Sequence[float], ndarray, None] = None,
+        binned: bool = False,
     ):
+        """Estimates the density of points with a kernel.
+
+        Args:
+            points: Points as (x, y).  Defaults to the cells of this grid.
+            max_workers: Number of threads.  Defaults to 1.
+            bandwidth: Kernel bandwidth in map units.
+            kernel: Kernel function.  'quartic' requires ``binned``.
+            weights: Optional weight per point.
+            binned: Whether to bin points onto the grid with linear binning and
+                convolve with the kernel via FFT instead of evaluating every cell
+                against every point.  Much faster for many points, and accurate
+                when the bandwidth is larger than the cell size.
+
+        Returns:
+            Grid: Density per unit area, integrating to 1 over the plane.
+        """
         if points is None:
-            points = [(p.x, p.y) for p in self.to_points()]
-        return density(points, self.extent, self.crs, self.cell_size, max_workers)
+            points = np.column_stack(self.to_arrays()[:2])
+        return density(
+            points,
+            self.extent,
+            self.crs,
+            self.cell_size,
+            max_workers,
+            bandwidth,
+            kernel,
+            weights,
+            binned,
+        )
+
+    @overload
+    def distance(
+        self,
+        points: Union[Sequence[Tuple[float, float]], ndarray, None] = None,
+        max_workers: int = 1,
+        max_distance: Optional[float] = None,
+        allocation: Literal[False] = False,
+    ) -> "Grid": ...
+
+    @overload
+    def distance(
+        self,
+        points: Union[Sequence[Tuple[float, float]], ndarray, None],
+        max_workers: int,
+        max_distance: Optional[float],
+        allocation: Literal[True],
+    ) -> Tuple["Grid", "Grid"]: ...
 
+    @overload
     def distance(
         self,
-        points: Optional[Sequence[Tuple[float, float]]] = None,
+        points: Union[Sequence[Tuple[float, float]], ndarray, None] = None,
         max_workers: int = 1,
+        max_distance: Optional[float] = None,
+        *,
+        allocation: Literal[True],
+    ) -> Tuple["Grid", "Grid"]: ...
+
+    def distance(
+        self,
+        points: Union[Sequence[Tuple[float, float]], ndarray, None] = None,
+        max_workers: int = 1,
+        max_distance: Optional[float] = None,
+        allocation: bool = False,
     ):
-        if points is None:
-            points = [(p.x, p.y) for p in self.to_points()]
-        return distance(points, self.extent, self.crs, self.cell_size, max_workers)
+        """Computes the Euclidean distance to the nearest source.
+
+        Args:
+            points: Source points.  Defaults to None (non-NaN cells of this grid).
+            max_workers: Number of threads.  Defaults to 1.
+            max_distance: Cells farther than this are set to NaN.  Defaults to None.
+            allocation: Whether to also return the nearest source.  Defaults to False.
+
+        Returns:
+            Grid: Distance in map units, or a tuple of distance and allocation grids.
+            The allocation grid holds the value of the nearest source cell, or the
+            index of the nearest point when points are given.
+        """
+        if points is not None:
+            return distance(
+                points,
+                self.extent,
+                self.crs,
+                self.cell_size,
+                max_workers,
+                max_distance,
+                allocation,  # type: ignore
+            )
+
+        sources = ~np.isnan(self.data)
+
+        if not sources.any():
+            g = self.local(np.full(self.data.shape, np.nan))
+            return (g, g) if allocation else g
+
+        result = distance_transform_edt(
+            ~sources,
+            sampling=(self.cell_size.y, self.cell_size.x),
+            return_indices=allocation,
+        )
+
+        distances, indices = cast(
+            Tuple[ndarray, Optional[ndarray]], result if allocation else (result, None)
+        )
+        outside = distances > max_distance if max_distance is not None else None
+
+        if outside is not None:
+            distances[outside] = np.nan
+
+        g = self.local(distances)
+
+        if indices is None:
+            return g
+
+        nearest = self.data[indices[0], indices[1]]
+
+        if outside is not None:
+            nearest = np.where(outside, np.nan, nearest)
+
+        return g, self.local(nearest)
 
     def interp_idw(
         self,
-        points: Optional[Sequence[Tuple[float, float, float]]] = None,
+        points: Union[Sequence[Tuple[float, float, float]], ndarray, None] = None,
         cell_size: Union[Tuple[float, float], float, None] = None,
         radius: Optional[float] = None,
         max_workers: int = 1,
+        k: Optional[int] = None,
+        power: float = 2,
+        executor: ExecutorType = "thread",
     ):
         if points is None:
-            points = self.to_points()
+            points = np.column_stack(self.to_arrays())
         return idw(
             points,
             self.extent,
@@ -539,36 +675,15 @@ class Grid(GridCore, Interpolation, Prediction, Focal, Zonal, Shapefile):
             cell_size or self.cell_size,
             radius,
             max_workers,
+            k,
+            power,
+            executor,
         )
 
     def randomize(self, normal_distribution: bool = False):
         f = np.random.randn if normal_distribution else np.random.rand
         return self.local(f(self.height, self.width))
 
-    def aspect(self, radians: bool = False):
-        y, x = gradient(self.data)
-        g = self.local(arctan2(-y, x))
-        if radians:
-            return g
-        return (g.local(np.degrees) + 360) % 360
-
-    def slope(self, radians: bool = False):
-        y, x = gradient(self.data)
-        g = self.local(arctan(sqrt(x * x + y * y)))
-        if radians:
-            return g
-        return g.local(np.degrees)
-
-    def hillshade(self, azimuth: float = 315, altitude: float = 45):
-        azimuth = np.deg2rad(azimuth)
-        altitude = np.deg2rad(altitude)
-        aspect = self.aspect(True).data
-        slope = (pi / 2.0 - self.slope(True)).data
-        shaded = sin(altitude) * sin(slope) + cos(altitude) * cos(slope) * cos(
-            azimuth - aspect
-        )
-        return self.local((255 * (shaded + 1) / 2))
-
     def con(
         self,
         predicate: Union[Operand, Callable[["Grid"], "Grid"]],
@@ -601,36 +716,14 @@ class Grid(GridCore, Interpolation, Prediction, Focal, Zonal, Shapefile):
         tile_size: int = 256,
         buffer: int = 0,
         max_workers: int = 1,
+        executor: ExecutorType = "thread",
     ) -> "Grid":
-        cell_x, cell_y = self.cell_size
-        tiles = list(self.extent.tiles(cell_x * tile_size, cell_y * tile_size))
-
-        if len(tiles) <= 4:
+        count = ceil(self.width / tile_size) * ceil(self.height / tile_size)
+        if count <= 4 and max_workers <= 1:
             return func(self)
-
-        x = buffer * cell_x
-        y = buffer * cell_y
-
-        def f(tile: Extent):
-            xmin, ymin, xmax, ymax = tile
-            g = func(self.clip(xmin - x, ymin - y, xmax + x, ymax + y))
-            if buffer == 0:
-                return g
-            return g.clip(xmin, ymin, xmax, ymax)
-
-        result: Optional["Grid"] = None
-
-        if max_workers > 1:
-            with ThreadPoolExecutor(max_workers or 1) as executor:
-                for r in executor.map(f, tiles):
-                    result = result.mosaic(r) if result else r
-        else:
-            for i, tile in enumerate(tiles):
-                print(f"Processing tile {i + 1} of {len(tiles)}...")
-                result = result.mosaic(f(tile)) if result else f(tile)
-
-        assert result
-        return result
+        return process_tiles(
+            self, func, None, tile_size, buffer, max_workers, executor=executor
+        )
 
     def value_at(self, x: float, y: float) -> float:
         c = int((x - self.xmin) / self.cell_size.x)
@@ -643,9 +736,9 @@ class Grid(GridCore, Interpolation, Prediction, Focal, Zonal, Shapefile):
     def data_extent(self) -> Extent:
         if not self.has_nan:
             return self.extent
-        points = self._coords_with_values()
-        xmin, ymin = points[:, :2].min(axis=0)
-        xmax, ymax = points[:, :2].max(axis=0)
+        x, y, _ = self.to_arrays()
+        xmin, ymin = x.min(), y.min()
+        xmax, ymax = x.max(), y.max()
         return Extent(
             xmin - self.cell_size.x / 2,
             ymin - self.cell_size.y / 2,
@@ -661,21 +754,79 @@ class Grid(GridCore, Interpolation, Prediction, Focal, Zonal, Shapefile):
         offset = self.cell_size.y / 2
         return np.linspace(self.ymax - offset, self.ymin + offset, self.height)
 
-    def _coords(self):
+    def _coords(self, dtype: str = "float32"):
         x, y = np.meshgrid(self._xs(), self._ys())
-        return np.asarray(np.column_stack([x.ravel(), y.ravel()]), "float32")
+        return np.asarray(np.column_stack([x.ravel(), y.ravel()]), dtype)
 
-    def _coords_with_values(self, include_nan: bool = False):
-        x, y = np.meshgrid(self._xs(), self._ys())
-        array = np.column_stack([x.ravel(), y.ravel(), self.data.ravel()])
+    @overload
+    def to_arrays(
+        self,
+        include_nan: bool = False,
+        chunk_size: None = None,
+        dtype: Literal["float32", "float64"] = "float64",
+    ) -> Tuple[ndarray, ndarray, ndarray]: ...
+
+    @overload
+    def to_arrays(
+        self,
+        include_nan: bool,
+        chunk_size: int,
+        dtype: Literal["float32", "float64"] = "float64",
+    ) -> Iterator[Tuple[ndarray, ndarray, ndarray]]: ...
+
+    @overload
+    def to_arrays(
+        self,
+        include_nan: bool = False,
+        *,
+        chunk_size: int,
+        dtype: Literal["float32", "float64"] = "float64",
+    ) -> Iterator[Tuple[ndarray, ndarray, ndarray]]: ...
+
+    def to_arrays(
+        self,
+        include_nan: bool = False,
+        chunk_size: Optional[int] = None,
+        dtype: Literal["float32", "float64"] = "float64",
+    ) -> Union[
+        Tuple[ndarray, ndarray, ndarray], Iterator[Tuple[ndarray, ndarray, ndarray]]
+    ]:
+        """Exports cell centres and values as flat arrays.
+
+        Args:
+            include_nan: Whether to include NaN cells.  Defaults to False.
+            chunk_size: Approximate number of cells per chunk.  Defaults to None.
+            dtype: Data type of the arrays.  Defaults to "float64".
+
+        Returns:
+            Tuple[ndarray, ndarray, ndarray]: x, y and value arrays, or an iterator
+            of such tuples in row order when chunk_size is given.
+        """
+        if chunk_size is None:
+            return self._arrays(0, self.height, include_nan, dtype)
+        rows = max(1, chunk_size // self.width)
+        return (
+            self._arrays(start, start + rows, include_nan, dtype)
+            for start in range(0, self.height, rows)
+        )
+
+    def _arrays(
+        self, start: int, stop: int, include_nan: bool, dtype: str
+    ) -> Tuple[ndarray, ndarray, ndarray]:
+        data = self.data[start:stop]
+        xs = self._xs().astype(dtype)
+        ys = self._ys()[start:stop].astype(dtype)
         if include_nan:
-            return array
-        return array[~np.isnan(array[:, 2])]
+            x = np.tile(xs, len(ys))
+            y = np.repeat(ys, self.width)
+            return x, y, data.ravel().astype(dtype)
+        r, c = np.nonzero(~np.isnan(data))
+        return xs[c], ys[r], data[r, c].astype(dtype)
 
     def to_points(self, include_nan: bool = False) -> List[PointValue]:
         return [
             PointValue(float(x), float(y), float(v))
-            for x, y, v in self._coords_with_values(include_nan)
+            for x, y, v in zip(*self.to_arrays(include_nan))
         ]
 
     def to_polygons(self, include_nan: bool = False) -> List[Tuple[Polygon, float]]:
@@ -802,12 +953,21 @@ class Grid(GridCore, Interpolation, Prediction, Focal, Zonal, Shapefile):
         height: int = 600,
         attribution: Optional[str] = None,
         grayscale: bool = True,
+        tiles: bool = False,
         **kwargs,
     ):
         from glidergun._display import get_folium_map
 
         return get_folium_map(
-            self, opacity, basemap, width, height, attribution, grayscale, **kwargs
+            self,
+            opacity,
+            basemap,
+            width,
+            height,
+            attribution,
+            grayscale,
+            tiles,
+            **kwargs,
         )
 
     def type(self, dtype: DataType):
@@ -894,6 +1054,33 @@ def grid(
     ...
 
 
+@overload
+def grid(  # type: ignore
+    data: str,
+    extent: None = None,
+    crs: None = None,
+    cell_size: None = None,
+    index: int = 1,
+    *,
+    lazy: Literal[True],
+) -> LazyGrid:
+    """Creates a grid that reads pixels from the file only when needed.
+
+    Args:
+        data: File path.
+        index (int, optional): Band index.  Defaults to 1.
+        lazy: Must be True.
+
+    Example:
+        >>> grid("n55_e008_1arc_v3.bil", lazy=True)
+        lazy: 1801x3601 | crs: EPSG:4326 | cell: 0.000555555555555556, 0.000277777777777778
+
+    Returns:
+        LazyGrid: A lazy grid.
+    """
+    ...
+
+
 @overload
 def grid(  # type: ignore
     data: DatasetReader,
@@ -1059,7 +1246,8 @@ def grid(
     crs: Union[int, CRS, None] = None,
     cell_size: Union[Tuple[float, float], float, None] = None,
     index: int = 1,
-) -> Grid:
+    lazy: bool = False,
+) -> Union[Grid, LazyGrid]:
     def read(dataset) -> Grid:
         g = _read(dataset, index, extent)
         return g if g is None or cell_size is None else g.resample(cell_size)  # type: ignore
@@ -1067,6 +1255,10 @@ def grid(
     match data:
         case DatasetReader():
             return read(data)
+        case str() if lazy:
+            assert extent is None, "Extent is not supported for lazy grids."
+            assert cell_size is None, "Cell size is not supported for lazy grids."
+            return LazyGrid(FileSource(data, index))
         case str():
             with rasterio.open(data) as dataset:
                 return read(dataset)
@@ -1243,92 +1435,234 @@ def maximum(*grids: Grid) -> Grid:
 
 
 def density(
-    points: Sequence[Tuple[float, float]],
+    points: Union[Sequence[Tuple[float, float]], ndarray],
     extent: Tuple[float, float, float, float],
     crs: Union[int, CRS],
     cell_size: Union[Tuple[float, float], float],
     max_workers: int = 1,
+    bandwidth: float = 1.0,
+    kernel: DensityKernel = "gaussian",
+    weights: Union[Sequence[float], ndarray, None] = None,
+    binned: bool = False,
 ):
     g = grid(np.nan, extent, crs, cell_size)
 
     if len(points) == 0:
         return g
 
+    coords = np.asarray(points, dtype="float64")[:, :2]
+
+    if binned:
+        return g.local(_binned_density(g, coords, bandwidth, kernel, weights))
+
+    if kernel == "quartic":
+        raise ValueError("The quartic kernel is only supported with binned=True.")
+
+    kernel_density = KernelDensity(bandwidth=bandwidth, kernel=kernel)
+    kernel_density.fit(coords, sample_weight=weights)
+
     def f(g: Grid) -> Grid:
-        kernel_density = KernelDensity()
-        kernel_density.fit(np.array(points))
         result = np.exp(kernel_density.score_samples(g._coords()))
         return g.local(result.reshape(g.height, g.width))
 
     return g.process_tiles(f, 256, 0, max_workers)
 
 
+def _binned_density(
+    g: Grid,
+    coords: ndarray,
+    bandwidth: float,
+    kernel: DensityKernel,
+    weights: Union[Sequence[float], ndarray, None],
+) -> ndarray:
+    dx, dy = g.cell_size
+    support = (4 if kernel == "gaussian" else 1) * bandwidth
+    rx, ry = ceil(support / dx), ceil(support / dy)
+
+    w = np.ones(len(coords)) if weights is None else np.asarray(weights, "float64")
+    u = (coords[:, 0] - g.xmin) / dx - 0.5 + rx
+    v = (g.ymax - coords[:, 1]) / dy - 0.5 + ry
+    col, row = np.floor(u).astype("int64"), np.floor(v).astype("int64")
+    fx, fy = u - col, v - row
+
+    height, width = g.height + 2 * ry, g.width + 2 * rx
+    histogram = np.zeros(height * width)
+    for r, c, weight in (
+        (row, col, (1 - fx) * (1 - fy)),
+        (row, col + 1, fx * (1 - fy)),
+        (row + 1, col, (1 - fx) * fy),
+        (row + 1, col + 1, fx * fy),
+    ):
+        inside = (r >= 0) & (r < height) & (c >= 0) & (c < width)
+        histogram += np.bincount(
+            r[inside] * width + c[inside],
+            (w * weight)[inside],
+            minlength=height * width,
+        )
+
+    x = np.arange(-rx, rx + 1) * dx / bandwidth
+    y = np.arange(-ry, ry + 1) * dy / bandwidth
+    r2 = y[:, None] ** 2 + x[None, :] ** 2
+    if kernel == "gaussian":
+        weights_2d = np.exp(-r2 / 2)
+    elif kernel == "epanechnikov":
+        weights_2d = np.clip(1 - r2, 0, None)
+    else:
+        weights_2d = np.clip(1 - r2, 0, None) ** 2
+
+    weights_2d /= weights_2d.sum() * dx * dy * w.sum()
+    method = _convolution_backend(weights_2d, "auto")
+    result = _convolve(histogram.reshape(height, width), weights_2d, method)
+    return np.clip(result[ry : ry + g.height, rx : rx + g.width], 0, None)
+
+
+@overload
+def distance(
+    points: Union[Sequence[Tuple[float, float]], ndarray],
+    extent: Tuple[float, float, float, float],
+    crs: Union[int, CRS],
+    cell_size: Union[Tuple[float, float], float],
+    max_workers: int = 1,
+    max_distance: Optional[float] = None,
+    allocation: Literal[False] = False,
+) -> Grid: ...
+
+
+@overload
+def distance(
+    points: Union[Sequence[Tuple[float, float]], ndarray],
+    extent: Tuple[float, float, float, float],
+    crs: Union[int, CRS],
+    cell_size: Union[Tuple[float, float], float],
+    max_workers: int,
+    max_distance: Optional[float],
+    allocation: Literal[True],
+) -> Tuple[Grid, Grid]: ...
+
+
+@overload
+def distance(
+    points: Union[Sequence[Tuple[float, float]], ndarray],
+    extent: Tuple[float, float, float, float],
+    crs: Union[int, CRS],
+    cell_size: Union[Tuple[float, float], float],
+    max_workers: int = 1,
+    max_distance: Optional[float] = None,
+    *,
+    allocation: Literal[True],
+) -> Tuple[Grid, Grid]: ...
+
+
 def distance(
-    points: Sequence[Tuple[float, float]],
+    points: Union[Sequence[Tuple[float, float]], ndarray],
     extent: Tuple[float, float, float, float],
     crs: Union[int, CRS],
     cell_size: Union[Tuple[float, float], float],
     max_workers: int = 1,
+    max_distance: Optional[float] = None,
+    allocation: bool = False,
 ):
     g = grid(np.nan, extent, crs, cell_size)
 
     if len(points) == 0:
-        return g
+        return (g, g) if allocation else g
+
+    tree = cKDTree(np.asarray(points, dtype="float64")[:, :2])
+    bound = np.inf if max_distance is None else np.nextafter(max_distance, np.inf)
 
     def f(g: Grid) -> Grid:
-        distances = cdist(g._coords(), np.array(points))
-        result = distances.min(axis=1)
-        return g.local(result.reshape(g.height, g.width))
+        distances, _ = tree.query(g._coords("float64"), distance_upper_bound=bound)
+        distances[np.isinf(distances)] = np.nan
+        return g.local(distances.reshape(g.height, g.width))
 
-    return g.process_tiles(f, 256, 0, max_workers)
+    if not allocation:
+        return g.process_tiles(f, 256, 0, max_workers)
+
+    distances, indices = tree.query(
+        g._coords("float64"), distance_upper_bound=bound, workers=max_workers
+    )
+    outside = np.isinf(distances)
+    distances[outside] = np.nan
+    nearest = np.where(outside, np.nan, indices)
+    return (
+        g.local(distances.reshape(g.height, g.width)),
+        g.local(nearest.reshape(g.height, g.width)),
+    )
 
 
 def idw(
-    points: Sequence[Tuple[float, float, float]],
+    points: Union[Sequence[Tuple[float, float, float]], ndarray],
     extent: Tuple[float, float, float, float],
     crs: Union[int, CRS],
     cell_size: Union[Tuple[float, float], float],
     radius: Optional[float] = None,
     max_workers: int = 1,
+    k: Optional[int] = None,
+    power: float = 2,
+    executor: ExecutorType = "thread",
 ):
+    """Interpolates points using inverse distance weighting.
+
+    Args:
+        points: Tuples (x, y, value).
+        extent: Map extent.
+        crs: CRS or an EPSG code.
+        cell_size: Cell size.
+        radius: Search radius.  Defaults to None (unlimited).
+        max_workers: Number of threads.  Defaults to 1.
+        k: Number of nearest points used per cell.  Defaults to None (all points).
+        power: Power applied to distances.  Defaults to 2.
+        executor: "thread" or "process" (POSIX only).  Defaults to "thread".
+
+    Returns:
+        Grid: A new grid.
+    """
     g = grid(np.nan, extent, crs, cell_size)
 
     if len(points) == 0:
         return g
 
+    array = np.asarray(points, dtype="float64")
+    xy, values = array[:, :2], array[:, 2]
+    tree = cKDTree(xy)
+
+    def weigh(distances: ndarray):
+        return 1 / np.maximum(distances * distances, 1e-10) ** (power / 2)
+
     def f(g: Grid) -> Grid:
-        if radius:
-            e = Extent(
-                g.extent.xmin - radius,
-                g.extent.ymin - radius,
-                g.extent.xmax + radius,
-                g.extent.ymax + radius,
+        coords = g._coords("float64")
+        if k:
+            distances, indices = tree.query(
+                coords,
+                [*range(1, min(k, len(values)) + 1)],
+                distance_upper_bound=radius or np.inf,
+            )
+            found = np.isfinite(distances)
+            weights = np.where(found, weigh(distances), 0)
+            neighbors = values[np.where(found, indices, 0)]
+            numerator = (weights * neighbors).sum(axis=1)
+            denominator = weights.sum(axis=1)
+        elif radius:
+            pairs = cKDTree(coords).sparse_distance_matrix(
+                tree, radius, output_type="ndarray"
             )
-            points_adjusted = [p for p in points if e.intersects(*p[:2], *p[:2])]
-            if not points_adjusted:
-                return g
+            weights = weigh(pairs["v"])
+            n = len(coords)
+            numerator = np.bincount(pairs["i"], weights * values[pairs["j"]], n)
+            denominator = np.bincount(pairs["i"], weights, n)
         else:
-            points_adjusted = points
-
-        x, y, v = zip(*points_adjusted)
-        values = np.array(v)
-        coords = g._coords()
-        xi, yi = coords[:, 0], coords[:, 1]
-        distances = np.asarray(
-            (xi[:, None] - x) ** 2 + (yi[:, None] - y) ** 2, "float32"
-        )
-        distances[distances == 0] = 1e-10
-        weights = 1 / distances
-
-        if radius:
-            mask = distances > radius**2
-            distances[mask] = np.inf
-            weights[mask] = 0
-
-        result = np.dot(weights / weights.sum(axis=1, keepdims=True), values)
+            numerator = np.zeros(len(coords))
+            denominator = np.zeros(len(coords))
+            step = max(1, 2**22 // len(values))
+            for i in range(0, len(coords), step):
+                weights = weigh(cdist(coords[i : i + step], xy))
+                numerator[i : i + step] = weights @ values
+                denominator[i : i + step] = weights.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = numerator / denominator
         return g.local(result.reshape(g.height, g.width))
 
-    return g.process_tiles(f, 256, 0, max_workers)
+    return g.process_tiles(f, 256, 0, max_workers, executor)
 
 
 def pca(n_components: int = 1, *grids: Grid) -> Tuple[Grid, ...]:
@@ -1,13 +1,17 @@
+import warnings
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import (
     TYPE_CHECKING,
     Any,
     Callable,
+    Literal,
     Optional,
     Sequence,
     Tuple,
     Union,
     cast,
+    overload,
 )
 
 import numpy as np
@@ -19,8 +23,10 @@ from scipy.interpolate import (
     NearestNDInterpolator,
     RBFInterpolator,
 )
+from scipy.optimize import OptimizeWarning, curve_fit
+from scipy.spatial import cKDTree  # type: ignore
 
-from glidergun._literals import InterpolationKernel
+from glidergun._literals import ExecutorType, InterpolationKernel, VariogramModel
 
 if TYPE_CHECKING:
     from glidergun._grid import Grid
@@ -30,12 +36,14 @@ if TYPE_CHECKING:
 class Interpolation:
     def interp_clough_tocher(
         self,
-        points: Optional[Sequence[Tuple[float, float, float]]] = None,
+        points: Union[Sequence[Tuple[float, float, float]], ndarray, None] = None,
         cell_size: Union[Tuple[float, float], float, None] = None,
         fill_value: float = np.nan,
         tol: float = 0.000001,
         maxiter: int = 400,
         rescale: bool = False,
+        max_workers: int = 1,
+        executor: ExecutorType = "thread",
     ):
         def f(coords, values):
             return CloughTocher2DInterpolator(
@@ -44,49 +52,100 @@ class Interpolation:
 
         g = cast("Grid", self)
         if points is None:
-            points = g.to_points()
-        return interpolate(f, points, g.extent, g.crs, cell_size or g.cell_size)
+            points = np.column_stack(g.to_arrays())
+        return interpolate(
+            f, points, g.extent, g.crs, cell_size or g.cell_size, max_workers, executor
+        )
 
     def interp_linear(
         self,
-        points: Optional[Sequence[Tuple[float, float, float]]] = None,
+        points: Union[Sequence[Tuple[float, float, float]], ndarray, None] = None,
         cell_size: Union[Tuple[float, float], float, None] = None,
         fill_value: float = np.nan,
         rescale: bool = False,
+        max_workers: int = 1,
+        executor: ExecutorType = "thread",
     ):
         def f(coords, values):
             return LinearNDInterpolator(coords, values, fill_value, rescale)
 
         g = cast("Grid", self)
         if points is None:
-            points = g.to_points()
-        return interpolate(f, points, g.extent, g.crs, cell_size or g.cell_size)
+            points = np.column_stack(g.to_arrays())
+        return interpolate(
+            f, points, g.extent, g.crs, cell_size or g.cell_size, max_workers, executor
+        )
 
     def interp_nearest(
         self,
-        points: Optional[Sequence[Tuple[float, float, float]]] = None,
+        points: Union[Sequence[Tuple[float, float, float]], ndarray, None] = None,
         cell_size: Union[Tuple[float, float], float, None] = None,
         rescale: bool = False,
         tree_options: Any = None,
+        max_workers: int = 1,
+        executor: ExecutorType = "thread",
     ):
         def f(coords, values):
             return NearestNDInterpolator(coords, values, rescale, tree_options)
 
         g = cast("Grid", self)
         if points is None:
-            points = g.to_points()
-        return interpolate(f, points, g.extent, g.crs, cell_size or g.cell_size)
+            points = np.column_stack(g.to_arrays())
+        return interpolate(
+            f, points, g.extent, g.crs, cell_size or g.cell_size, max_workers, executor
+        )
 
     def interp_rbf(
         self,
-        points: Optional[Sequence[Tuple[float, float, float]]] = None,
+        points: Union[Sequence[Tuple[float, float, float]], ndarray, None] = None,
         cell_size: Union[Tuple[float, float], float, None] = None,
         neighbors: Optional[int] = None,
         smoothing: float = 0,
         kernel: InterpolationKernel = "thin_plate_spline",
         epsilon: float = 1,
         degree: Optional[int] = None,
+        max_workers: int = 1,
+        tile_size: Optional[int] = None,
+        halo: Optional[float] = None,
+        overlap: int = 8,
+        max_points: int = 1000,
+        seed: int = 0,
+        executor: ExecutorType = "thread",
     ):
+        """Interpolates points using radial basis functions.
+
+        By default, one interpolator is fitted to all points.  If ``tile_size`` is
+        set, the output is split into tiles of that many cells and a small
+        interpolator is fitted per tile, using only the points within ``halo``
+        map units of the tile.  Tiles with more than ``max_points`` points are
+        fitted to a random sample of that many, which bounds the cost of each fit
+        but ignores the other points; raise ``max_points`` for dense samples.  The
+        sample depends only on ``seed``, the tile and the order of the points.
+        Tiles are extended by ``overlap`` cells and blended with linear weights
+        so that seams do not show.
+
+        Args:
+            points: Points as (x, y, value).  Defaults to the cells of this grid.
+            cell_size: Output cell size.  Defaults to the cell size of this grid.
+            neighbors: Number of nearest points used by each evaluation.
+            smoothing: Smoothing parameter.
+            kernel: RBF kernel.
+            epsilon: Shape parameter.
+            degree: Degree of the added polynomial.
+            max_workers: Number of threads.
+            tile_size: Tile size in cells for local interpolation.
+            halo: Search distance around each tile in map units.  Defaults to
+                half the tile width.
+            overlap: Number of cells by which tiles overlap for blending.
+            max_points: Maximum number of points fitted per tile.
+            seed: Seed of the random sample drawn from tiles with more points.
+            executor: "thread" or "process" (POSIX only).  Local interpolation
+                always uses threads.
+
+        Returns:
+            Grid: Interpolated grid.
+        """
+
         def f(coords, values):
             return RBFInterpolator(
                 coords, values, neighbors, smoothing, kernel, epsilon, degree
@@ -94,16 +153,151 @@ class Interpolation:
 
         g = cast("Grid", self)
         if points is None:
-            points = g.to_points()
-        return interpolate(f, points, g.extent, g.crs, cell_size or g.cell_size)
+            points = np.column_stack(g.to_arrays())
+        if tile_size:
+            return interpolate_tiles(
+                f,
+                points,
+                g.extent,
+                g.crs,
+                cell_size or g.cell_size,
+                tile_size,
+                halo,
+                overlap,
+                max_workers,
+                max_points=max_points,
+                seed=seed,
+            )
+        return interpolate(
+            f, points, g.extent, g.crs, cell_size or g.cell_size, max_workers, executor
+        )
+
+    @overload
+    def interp_kriging(
+        self,
+        points: Union[Sequence[Tuple[float, float, float]], ndarray, None] = None,
+        cell_size: Union[Tuple[float, float], float, None] = None,
+        model: VariogramModel = "spherical",
+        neighbors: int = 16,
+        universal: bool = False,
+        variance: Literal[False] = False,
+        max_workers: int = 1,
+    ) -> "Grid": ...
+
+    @overload
+    def interp_kriging(
+        self,
+        points: Union[Sequence[Tuple[float, float, float]], ndarray, None],
+        cell_size: Union[Tuple[float, float], float, None],
+        model: VariogramModel,
+        neighbors: int,
+        universal: bool,
+        variance: Literal[True],
+        max_workers: int = 1,
+    ) -> Tuple["Grid", "Grid"]: ...
+
+    @overload
+    def interp_kriging(
+        self,
+        points: Union[Sequence[Tuple[float, float, float]], ndarray, None] = None,
+        cell_size: Union[Tuple[float, float], float, None] = None,
+        model: VariogramModel = "spherical",
+        neighbors: int = 16,
+        universal: bool = False,
+        *,
+        variance: Literal[True],
+        max_workers: int = 1,
+    ) -> Tuple["Grid", "Grid"]: ...
+
+    def interp_kriging(
+        self,
+        points: Union[Sequence[Tuple[float, float, float]], ndarray, None] = None,
+        cell_size: Union[Tuple[float, float], float, None] = None,
+        model: VariogramModel = "spherical",
+        neighbors: int = 16,
+        universal: bool = False,
+        variance: bool = False,
+        max_workers: int = 1,
+    ):
+        """Interpolates points by kriging within a moving neighbourhood.
+
+        A variogram model is fitted to an empirical variogram of sampled point
+        pairs.  Each cell is then estimated from its nearest points.
+
+        Args:
+            points: Points as (x, y, value).  Defaults to the cells of this grid.
+            cell_size: Output cell size.  Defaults to the cell size of this grid.
+            model: Variogram model.
+            neighbors: Number of nearest points used for each cell.
+            universal: Whether to use universal kriging with a linear drift
+                instead of ordinary kriging.
+            variance: Whether to also return the kriging variance.
+            max_workers: Number of threads.
+
+        Returns:
+            Grid: Interpolated grid, or a tuple of the interpolated grid and the
+            kriging variance grid if ``variance`` is True.
+        """
+        g = cast("Grid", self)
+        if points is None:
+            points = np.column_stack(g.to_arrays())
+        return kriging(
+            points,
+            g.extent,
+            g.crs,
+            cell_size or g.cell_size,
+            model,
+            neighbors,
+            universal,
+            variance,
+            max_workers,
+        )
 
 
 def interpolate(
     interpolator_factory: Callable[[ndarray, ndarray], Any],
-    points: Sequence[Tuple[float, float, float]],
+    points: Union[Sequence[Tuple[float, float, float]], ndarray],
+    extent: Tuple[float, float, float, float],
+    crs: Union[int, CRS],
+    cell_size: Union[Tuple[float, float], float],
+    max_workers: int = 1,
+    executor: ExecutorType = "thread",
+):
+    from glidergun._grid import Grid, grid
+
+    g = grid(np.nan, extent, crs, cell_size)
+
+    if len(points) == 0:
+        return g
+
+    array = np.asarray(points, dtype="float64")
+    interp = interpolator_factory(array[:, :2], array[:, 2])
+    interp(array[:1, :2])  # Builds lazily computed state before threads share it.
+    xs, ys = _axes(g)
+
+    def f(tile: Grid) -> Grid:
+        col = round((tile.xmin - g.xmin) / g.cell_size.x)
+        row = round((g.ymax - tile.ymax) / g.cell_size.y)
+        x, y = np.meshgrid(xs[col : col + tile.width], ys[row : row + tile.height])
+        data = interp(np.column_stack([x.ravel(), y.ravel()]))
+        return tile.local(data.reshape(x.shape).astype("float32"))
+
+    return g.process_tiles(f, 256, 0, max_workers, executor)
+
+
+def interpolate_tiles(
+    interpolator_factory: Callable[[ndarray, ndarray], Any],
+    points: Union[Sequence[Tuple[float, float, float]], ndarray],
     extent: Tuple[float, float, float, float],
     crs: Union[int, CRS],
     cell_size: Union[Tuple[float, float], float],
+    tile_size: int,
+    halo: Optional[float] = None,
+    overlap: int = 8,
+    max_workers: int = 1,
+    min_points: int = 32,
+    max_points: int = 1000,
+    seed: int = 0,
 ):
     from glidergun._grid import grid
 
@@ -112,12 +306,233 @@ def interpolate(
     if len(points) == 0:
         return g
 
-    coords = np.array([p[:2] for p in points])
-    values = np.array([p[2] for p in points])
+    array = np.asarray(points, dtype="float64")
+    coords, values = array[:, :2], array[:, 2]
+    tree = cKDTree(coords)
+    xs, ys = _axes(g)
+    if halo is None:
+        halo = tile_size * max(g.cell_size) / 2
+
+    def f(origin: Tuple[int, int]):
+        rows, row_weights = _extend(origin[0], tile_size, overlap, g.height)
+        cols, col_weights = _extend(origin[1], tile_size, overlap, g.width)
+        x, y = np.meshgrid(xs[cols], ys[rows])
+        center = (
+            (xs[cols.start] + xs[cols.stop - 1]) / 2,
+            (ys[rows.start] + ys[rows.stop - 1]) / 2,
+        )
+        radius = np.hypot(x[0, -1] - x[0, 0], y[-1, 0] - y[0, 0]) / 2 + halo
+        index = tree.query_ball_point(center, radius)
+        if len(index) < min_points:
+            index = np.atleast_1d(tree.query(center, min(min_points, len(coords)))[1])
+        elif len(index) > max_points:
+            rng = np.random.default_rng((seed, *origin))
+            index = rng.choice(index, max_points, replace=False)
+        interp = interpolator_factory(coords[index], values[index])
+        data = interp(np.column_stack([x.ravel(), y.ravel()])).reshape(x.shape)
+        return rows, cols, data, np.outer(row_weights, col_weights)
+
+    origins = [
+        (r, c)
+        for r in range(0, g.height, tile_size)
+        for c in range(0, g.width, tile_size)
+    ]
+    total = np.zeros((g.height, g.width))
+    weights = np.zeros((g.height, g.width))
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        for rows, cols, data, weight in executor.map(f, origins):
+            total[rows, cols] += data * weight
+            weights[rows, cols] += weight
+
+    return g.local((total / weights).astype("float32"))
+
+
+def _axes(g: "Grid") -> Tuple[ndarray, ndarray]:
+    return np.linspace(g.xmin, g.xmax, g.width), np.linspace(g.ymax, g.ymin, g.height)
+
+
+def _extend(start: int, size: int, overlap: int, length: int) -> Tuple[slice, ndarray]:
+    extended = slice(max(0, start - overlap), min(length, start + size + overlap))
+    index = np.arange(extended.start, extended.stop)
+    depth = np.minimum(index - (start - overlap), start + size + overlap - 1 - index)
+    return extended, np.clip((depth + 1) / (2 * overlap + 1), 1e-6, 1)
+
+
+def kriging(
+    points: Union[Sequence[Tuple[float, float, float]], ndarray],
+    extent: Tuple[float, float, float, float],
+    crs: Union[int, CRS],
+    cell_size: Union[Tuple[float, float], float],
+    model: VariogramModel = "spherical",
+    neighbors: int = 16,
+    universal: bool = False,
+    variance: bool = False,
+    max_workers: int = 1,
+    tile_size: int = 256,
+):
+    from glidergun._grid import grid
+
     g = grid(np.nan, extent, crs, cell_size)
-    interp = interpolator_factory(coords, values)
-    xs = np.linspace(g.xmin, g.xmax, g.width)
-    ys = np.linspace(g.ymax, g.ymin, g.height)
-    array = np.array([[x0, y0] for x0 in xs for y0 in ys])
-    data = interp(array).reshape((g.width, g.height)).transpose(1, 0)
-    return g.local(data)
+
+    if len(points) == 0:
+        return (g, g) if variance else g
+
+    array = np.asarray(points, dtype="float64")
+    coords, values = array[:, :2], array[:, 2]
+    center, scale = coords.mean(axis=0), max(np.ptp(coords, axis=0).max(), 1e-12)
+    coords = (coords - center) / scale
+    variogram = _fit_variogram(coords, values, model)
+    tree = cKDTree(coords)
+    k = min(neighbors, len(coords))
+    xs, ys = _axes(g)
+    estimate = np.empty((g.height, g.width), dtype="float32")
+    error = np.empty((g.height, g.width), dtype="float32") if variance else None
+
+    def f(origin: Tuple[int, int]):
+        rows = slice(origin[0], min(origin[0] + tile_size, g.height))
+        cols = slice(origin[1], min(origin[1] + tile_size, g.width))
+        x, y = np.meshgrid(xs[cols], ys[rows])
+        targets = (np.column_stack([x.ravel(), y.ravel()]) - center) / scale
+        z, v = _krige(coords, values, tree, targets, k, variogram, universal, variance)
+        estimate[rows, cols] = z.reshape(x.shape)
+        if error is not None and v is not None:
+            error[rows, cols] = v.reshape(x.shape)
+
+    origins = [
+        (r, c)
+        for r in range(0, g.height, tile_size)
+        for c in range(0, g.width, tile_size)
+    ]
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        list(executor.map(f, origins))
+
+    if error is None:
+        return g.local(estimate)
+    return g.local(estimate), g.local(error)
+
+
+def _variogram(model: VariogramModel) -> Callable[..., ndarray]:
+    def f(h: ndarray, nugget: float, sill: float, scale: float) -> ndarray:
+        r = h / max(scale, 1e-12)
+        if model == "exponential":
+            gamma = 1 - np.exp(-3 * r)
+        elif model == "gaussian":
+            gamma = 1 - np.exp(-3 * r * r)
+        elif model == "linear":
+            gamma = r
+        else:
+            gamma = np.where(r < 1, 1.5 * r - 0.5 * r**3, 1.0)
+        return np.where(h > 0, nugget + sill * gamma, 0.0)
+
+    return f
+
+
+def _fit_variogram(
+    coords: ndarray,
+    values: ndarray,
+    model: VariogramModel,
+    max_pairs: int = 200000,
+    bins: int = 20,
+) -> Callable[[ndarray], ndarray]:
+    n = len(coords)
+    if n * (n - 1) // 2 <= max_pairs:
+        i, j = np.triu_indices(n, 1)
+    else:
+        rng = np.random.default_rng(0)
+        i, j = rng.integers(0, n, (2, max_pairs))
+        i, j = i[i != j], j[i != j]
+
+    h = np.hypot(*(coords[i] - coords[j]).T)
+    semivariance = 0.5 * (values[i] - values[j]) ** 2
+    max_lag = h.max() / 2 if len(h) else 0
+
+    variogram = _variogram(model)
+    sill = float(np.var(values)) or 1.0
+
+    if max_lag <= 0:
+        return lambda d: variogram(d, 0.0, sill, 1.0)
+
+    index = np.minimum((h / max_lag * bins).astype("int64"), bins)
+    count = np.bincount(index, minlength=bins + 1)[:bins]
+    total = np.bincount(index, semivariance, minlength=bins + 1)[:bins]
+    valid = count > 0
+    lags = ((np.arange(bins) + 0.5) * max_lag / bins)[valid]
+    gamma = total[valid] / count[valid]
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", OptimizeWarning)
+            (nugget, partial_sill, scale), _ = curve_fit(
+                variogram,
+                lags,
+                gamma,
+                p0=(
+                    float(gamma.min()),
+                    max(float(gamma.max() - gamma.min()), 1e-12),
+                    max_lag / 2,
+                ),
+                sigma=np.maximum(gamma, 1e-12) / np.sqrt(count[valid]),
+                bounds=(0, [np.inf, np.inf, 2 * h.max()]),
+            )
+    except (RuntimeError, ValueError):
+        nugget, partial_sill, scale = 0.0, sill, max_lag / 2
+
+    return lambda d: variogram(d, nugget, partial_sill, scale)
+
+
+def _krige(
+    coords: ndarray,
+    values: ndarray,
+    tree: cKDTree,
+    targets: ndarray,
+    k: int,
+    variogram: Callable[[ndarray], ndarray],
+    universal: bool,
+    variance: bool,
+) -> Tuple[ndarray, Optional[ndarray]]:
+    distance, index = tree.query(targets, k)
+    distance, index = distance.reshape(len(targets), k), index.reshape(len(targets), k)
+    index = np.sort(index, axis=1)
+    sets, inverse = np.unique(index, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+
+    p = coords[sets]
+    drift = 3 if universal else 1
+    size = k + drift
+    a = np.zeros((len(sets), size, size))
+    a[:, :k, :k] = variogram(
+        np.hypot(*(p[:, :, None, :] - p[:, None, :, :]).transpose(3, 0, 1, 2))
+    )
+    a[:, :k, k] = a[:, k, :k] = 1
+    np.einsum("nii->ni", a)[:, :k] = -1e-6 * a[:, :k, :k].max()
+    if universal:
+        a[:, :k, k + 1 :] = p
+        a[:, k + 1 :, :k] = p.transpose(0, 2, 1)
+
+    try:
+        a_inv = np.linalg.inv(a)
+    except np.linalg.LinAlgError:
+        a_inv = np.linalg.pinv(a)
+
+    b = np.ones((len(targets), size))
+    b[:, :k] = variogram(
+        np.hypot(*(coords[index] - targets[:, None, :]).transpose(2, 0, 1))
+    )
+    if universal:
+        b[:, k + 1 :] = targets
+
+    rhs = np.zeros((len(sets), size))
+    rhs[:, :k] = values[sets]
+    u = np.einsum("nij,nj->ni", a_inv, rhs)
+    estimate = np.einsum("ni,ni->n", u[inverse], b)
+
+    if not variance:
+        return estimate, None
+
+    error = np.empty(len(targets))
+    for start in range(0, len(targets), 4096):
+        n = slice(start, start + 4096)
+        error[n] = np.einsum("ni,nij,nj->n", b[n], a_inv[inverse[n]], b[n])
+    return estimate, np.maximum(error, 0)
@@ -0,0 +1,484 @@
+import os
+from dataclasses import dataclass, field
+from functools import cached_property
+from math import ceil, floor
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import rasterio
+from numpy import ndarray
+from rasterio.crs import CRS
+from rasterio.transform import Affine, from_origin
+from rasterio.windows import Window, from_bounds
+
+from glidergun._literals import DataType, ExecutorType
+from glidergun._types import CellSize, Defaults, Extent
+from glidergun._utils import format_type
+
+if TYPE_CHECKING:
+    from glidergun._grid import Grid
+
+LazyOperand = Union["LazyGrid", "Grid", float, int]
+
+
+@dataclass(frozen=True, eq=False)
+class Node:
+    func: Callable[..., ndarray]
+    args: Tuple[Any, ...]
+
+    def evaluate(
+        self, rows: slice, cols: slice, cache: Optional[Dict[int, Any]] = None
+    ) -> ndarray:
+        cache = {} if cache is None else cache
+        args = (_evaluate(a, rows, cols, cache) for a in self.args)
+        return format_type(np.asanyarray(self.func(*args)))
+
+
+@dataclass(frozen=True, eq=False)
+class FileSource:
+    file: str
+    index: int = 1
+    handle: Dict[str, Any] = field(default_factory=dict, repr=False)
+    lock: Lock = field(default_factory=Lock, repr=False)
+
+    @cached_property
+    def profile(self) -> Dict[str, Any]:
+        with rasterio.open(self.file) as dataset:
+            return {
+                "width": dataset.width,
+                "height": dataset.height,
+                "transform": dataset.transform,
+                "crs": dataset.crs,
+                "nodata": dataset.nodata,
+            }
+
+    @property
+    def transform(self) -> Affine:
+        return self.profile["transform"]
+
+    @property
+    def crs(self) -> CRS:
+        return self.profile["crs"]
+
+    @property
+    def width(self) -> int:
+        return self.profile["width"]
+
+    @property
+    def height(self) -> int:
+        return self.profile["height"]
+
+    @property
+    def extent(self) -> Extent:
+        xmin, ymax = self.transform * (0, 0)
+        xmax, ymin = self.transform * (self.width, self.height)
+        return Extent(xmin, ymin, xmax, ymax)
+
+    @property
+    def cell_size(self) -> CellSize:
+        return CellSize(self.transform.a, -self.transform.e)
+
+    def read(self, rows: slice, cols: slice) -> "Grid":
+        from glidergun._grid import grid
+
+        window = Window.from_slices(rows, cols, self.height, self.width)
+        with self.lock:
+            if self.handle.get("pid") != os.getpid():
+                self.handle["dataset"] = rasterio.open(self.file)
+                self.handle["pid"] = os.getpid()
+            data = self.handle["dataset"].read(self.index, window=window)
+        nodata = self.profile["nodata"]
+        transform = self.transform * Affine.translation(window.col_off, window.row_off)
+        g = grid(data, transform, self.crs)
+        return g if nodata is None else g.set_nan(nodata)
+
+
+@dataclass(frozen=True, eq=False)
+class AlignedSource:
+    source: Union[FileSource, "AlignedSource", "Grid"]
+    transform: Affine
+    width: int
+    height: int
+
+    @property
+    def crs(self) -> CRS:
+        return self.source.crs
+
+    @property
+    def extent(self) -> Extent:
+        xmin, ymax = self.transform * (0, 0)
+        xmax, ymin = self.transform * (self.width, self.height)
+        return Extent(xmin, ymin, xmax, ymax)
+
+    @property
+    def cell_size(self) -> CellSize:
+        return CellSize(self.transform.a, -self.transform.e)
+
+    def read(self, rows: slice, cols: slice) -> "Grid":
+        from glidergun._grid import grid
+
+        bounds = Window(0, 0, self.width, self.height)  # type: ignore
+        window = Window.from_slices(rows, cols, self.height, self.width)
+        window = window.intersection(bounds)
+        transform = self.transform * Affine.translation(window.col_off, window.row_off)
+        xmin, ymax = transform * (0, 0)
+        xmax, ymin = transform * (window.width, window.height)
+        g = LazyGrid(self.source)._cover(xmin, ymin, xmax, ymax)
+        if g is None:
+            return grid(np.nan, (xmin, ymin, xmax, ymax), self.crs, self.cell_size)
+        return g._resample((xmin, ymin, xmax, ymax), self.cell_size, "nearest")
+
+
+@dataclass(frozen=True, eq=False)
+class LazyGrid:
+    expression: Union[Node, FileSource, AlignedSource, "Grid"]
+
+    def __repr__(self):
+        return (
+            f"lazy: {self.width}x{self.height} | "
+            + f"crs: {self.crs} | "
+            + f"cell: {self.cell_size.x}, {self.cell_size.y}"
+        )
+
+    @cached_property
+    def leaves(self) -> Tuple[Union[FileSource, AlignedSource, "Grid"], ...]:
+        return tuple(_leaves(self.expression, {}).values())
+
+    @property
+    def transform(self) -> Affine:
+        return self.leaves[0].transform
+
+    @property
+    def crs(self) -> CRS:
+        return self.leaves[0].crs
+
+    @property
+    def width(self) -> int:
+        return self.leaves[0].width
+
+    @property
+    def height(self) -> int:
+        return self.leaves[0].height
+
+    @property
+    def extent(self) -> Extent:
+        return self.leaves[0].extent
+
+    @property
+    def cell_size(self) -> CellSize:
+        return self.leaves[0].cell_size
+
+    @cached_property
+    def data(self) -> ndarray:
+        return self.compute().data
+
+    @property
+    def dtype(self) -> DataType:
+        return self.compute().dtype
+
+    def __add__(self, n: LazyOperand):
+        return self._apply(self, n, np.add)
+
+    __radd__ = __add__
+
+    def __sub__(self, n: LazyOperand):
+        return self._apply(self, n, np.subtract)
+
+    def __rsub__(self, n: LazyOperand):
+        return self._apply(n, self, np.subtract)
+
+    def __mul__(self, n: LazyOperand):
+        return self._apply(self, n, np.multiply)
+
+    __rmul__ = __mul__
+
+    def __pow__(self, n: LazyOperand):
+        return self._apply(self, n, np.power)
+
+    def __rpow__(self, n: LazyOperand):
+        return self._apply(n, self, np.power)
+
+    def __truediv__(self, n: LazyOperand):
+        return self._apply(self, n, np.true_divide)
+
+    def __rtruediv__(self, n: LazyOperand):
+        return self._apply(n, self, np.true_divide)
+
+    def __floordiv__(self, n: LazyOperand):
+        return self._apply(self, n, np.floor_divide)
+
+    def __rfloordiv__(self, n: LazyOperand):
+        return self._apply(n, self, np.floor_divide)
+
+    def __mod__(self, n: LazyOperand):
+        return self._apply(self, n, np.mod)
+
+    def __rmod__(self, n: LazyOperand):
+        return self._apply(n, self, np.mod)
+
+    def __lt__(self, n: LazyOperand):
+        return self._apply(self, n, np.less)
+
+    def __gt__(self, n: LazyOperand):
+        return self._apply(self, n, np.greater)
+
+    def __le__(self, n: LazyOperand):
+        return self._apply(self, n, np.less_equal)
+
+    def __ge__(self, n: LazyOperand):
+        return self._apply(self, n, np.greater_equal)
+
+    def __eq__(self, n: object):
+        if not _is_operand(n):
+            return NotImplemented
+        return self._apply(self, n, np.equal)  # type: ignore
+
+    def __ne__(self, n: object):
+        if not _is_operand(n):
+            return NotImplemented
+        return self._apply(self, n, np.not_equal)  # type: ignore
+
+    def __and__(self, n: LazyOperand):
+        return self._apply(self, n, np.bitwise_and)
+
+    __rand__ = __and__
+
+    def __or__(self, n: LazyOperand):
+        return self._apply(self, n, np.bitwise_or)
+
+    __ror__ = __or__
+
+    def __xor__(self, n: LazyOperand):
+        return self._apply(self, n, np.bitwise_xor)
+
+    __rxor__ = __xor__
+
+    def __rshift__(self, n: LazyOperand):
+        return self._apply(self, n, np.right_shift)
+
+    def __lshift__(self, n: LazyOperand):
+        return self._apply(self, n, np.left_shift)
+
+    def __rrshift__(self, n: LazyOperand):
+        return self._apply(n, self, np.right_shift)
+
+    def __rlshift__(self, n: LazyOperand):
+        return self._apply(n, self, np.left_shift)
+
+    def __neg__(self):
+        return self.local(lambda a: -1 * a)
+
+    def __pos__(self):
+        return self.local(lambda a: 1 * a)
+
+    def __invert__(self):
+        return self.local(lambda a: np.where(a, False, True))
+
+    __hash__ = object.__hash__
+
+    @classmethod
+    def _apply(cls, left: LazyOperand, right: LazyOperand, op: Callable):
+        left_adjusted, right_adjusted = _align(left, right)
+        return cls(Node(op, (_expression(left_adjusted), _expression(right_adjusted))))
+
+    def local(self, func: Callable[[ndarray], ndarray]):
+        return LazyGrid(Node(func, (self.expression,)))
+
+    def is_nan(self):
+        return self.local(np.isnan)
+
+    def abs(self):
+        return self.local(np.abs)
+
+    def sin(self):
+        return self.local(np.sin)
+
+    def cos(self):
+        return self.local(np.cos)
+
+    def tan(self):
+        return self.local(np.tan)
+
+    def arcsin(self):
+        return self.local(np.arcsin)
+
+    def arccos(self):
+        return self.local(np.arccos)
+
+    def arctan(self):
+        return self.local(np.arctan)
+
+    def log(self, base: Optional[float] = None):
+        if base is None:
+            return self.local(np.log)
+        return self.local(lambda a: np.log(a) / np.log(base))
+
+    def round(self, decimals: int = 0):
+        return self.local(lambda a: np.round(a, decimals))
+
+    def then(self, trueValue: LazyOperand, falseValue: LazyOperand):
+        operands = _align(self, trueValue, falseValue)
+        return LazyGrid(Node(np.where, tuple(map(_expression, operands))))
+
+    def read(self, window: Window) -> "Grid":
+        from glidergun._grid import grid
+
+        (r0, r1), (c0, c1) = window.toranges()
+        data = _evaluate(self.expression, slice(r0, r1), slice(c0, c1), {})
+        return grid(data, self.transform * Affine.translation(c0, r0), self.crs)
+
+    def clip(self, xmin: float, ymin: float, xmax: float, ymax: float) -> "Grid":
+        from glidergun._grid import grid
+
+        g = self._cover(xmin, ymin, xmax, ymax)
+        if g is None:
+            return grid(np.nan, (xmin, ymin, xmax, ymax), self.crs, self.cell_size)
+        return g.clip(xmin, ymin, xmax, ymax)
+
+    def _cover(
+        self, xmin: float, ymin: float, xmax: float, ymax: float
+    ) -> Optional["Grid"]:
+        window = from_bounds(xmin, ymin, xmax, ymax, self.transform)
+        c0 = max(floor(window.col_off) - 1, 0)
+        r0 = max(floor(window.row_off) - 1, 0)
+        c1 = min(ceil(window.col_off + window.width) + 1, self.width)
+        r1 = min(ceil(window.row_off + window.height) + 1, self.height)
+        if c1 <= c0 or r1 <= r0:
+            return None
+        return self.read(Window(c0, r0, c1 - c0, r1 - r0))  # type: ignore
+
+    def tiles(self, width: float, height: float):
+        for e in self.extent.tiles(width, height):
+            yield self.clip(*e)
+
+    def value_at(self, x: float, y: float) -> float:
+        c = int((x - self.extent.xmin) / self.cell_size.x)
+        r = int((self.extent.ymax - y) / self.cell_size.y)
+        if c < 0 or c >= self.width or r < 0 or r >= self.height:
+            return float(np.nan)
+        return float(self.read(Window(c, r, 1, 1)).data[0, 0])  # type: ignore
+
+    def process_tiles(
+        self,
+        func: Callable[["Grid"], "Grid"],
+        tile_size: int = 256,
+        buffer: int = 0,
+        max_workers: int = 1,
+        executor: ExecutorType = "thread",
+    ) -> "Grid":
+        from glidergun._tiling import process_tiles
+
+        return process_tiles(
+            self, func, None, tile_size, buffer, max_workers, executor=executor
+        )
+
+    def compute(self) -> "Grid":
+        return self._computed
+
+    @cached_property
+    def _computed(self) -> "Grid":
+        from glidergun._grid import Grid, grid
+
+        if isinstance(self.expression, Grid):
+            return self.expression
+
+        rows = max(1, Defaults.block_size // self.width)
+        blocks = range(0, self.height, rows)
+        cols = slice(0, self.width)
+        first = _evaluate(self.expression, slice(0, rows), cols, {})
+        data = np.empty((self.height, self.width), dtype=first.dtype)
+        data[:rows] = first
+
+        for start in blocks[1:]:
+            block = slice(start, start + rows)
+            data[block] = _evaluate(self.expression, block, cols, {})
+
+        return grid(data, self.transform, self.crs)
+
+    def save(self, file, dtype: Optional[DataType] = None, driver: str = ""):
+        self.compute().save(file, dtype, driver)
+
+
+def _is_operand(n: object) -> bool:
+    from glidergun._grid import Grid
+
+    return isinstance(n, (LazyGrid, Grid, float, int))
+
+
+def _expression(n: LazyOperand):
+    return n.expression if isinstance(n, LazyGrid) else n
+
+
+def _evaluate(n: Any, rows: slice, cols: slice, cache: Dict[int, Any]):
+    from glidergun._grid import Grid
+
+    if not isinstance(n, (Node, FileSource, AlignedSource, Grid)):
+        return n
+    if id(n) not in cache:
+        if isinstance(n, Node):
+            cache[id(n)] = n.evaluate(rows, cols, cache)
+        elif isinstance(n, (FileSource, AlignedSource)):
+            cache[id(n)] = n.read(rows, cols).data
+        else:
+            cache[id(n)] = n.data[rows, cols]
+    return cache[id(n)]
+
+
+def _leaves(n: Any, leaves: Dict[int, Any]) -> Dict[int, Any]:
+    from glidergun._grid import Grid
+
+    if isinstance(n, Node):
+        for a in n.args:
+            _leaves(a, leaves)
+    elif isinstance(n, (FileSource, AlignedSource, Grid)):
+        leaves.setdefault(id(n), n)
+    return leaves
+
+
+def _replace(n: Any, leaves: Dict[int, Any]):
+    if isinstance(n, Node) and id(n) not in leaves:
+        leaves[id(n)] = Node(n.func, tuple(_replace(a, leaves) for a in n.args))
+    return leaves.get(id(n), n)
+
+
+def _align(*operands: LazyOperand) -> List[LazyOperand]:
+    from glidergun._grid import Grid
+
+    spatial: List[LazyOperand] = [
+        LazyGrid(n) if isinstance(n, Grid) else n for n in operands
+    ]
+    frames = {(n.cell_size, n.extent) for n in spatial if isinstance(n, LazyGrid)}
+
+    if len(frames) <= 1:
+        return spatial
+
+    leaves: Dict[int, Any] = {}
+    for n in spatial:
+        if isinstance(n, LazyGrid):
+            _leaves(n.expression, leaves)
+
+    if len(set(leaf.crs for leaf in leaves.values())) > 1:
+        raise ValueError("Input grids must have the same CRS.")
+
+    first = next(iter(leaves.values()))
+    cell_size, extent = first.cell_size, Extent(*first.extent)
+    for leaf in leaves.values():
+        extent = extent & leaf.extent
+
+    transform = from_origin(extent.xmin, extent.ymax, *cell_size)
+    width = round((extent.xmax - extent.xmin) / cell_size.x)
+    height = round((extent.ymax - extent.ymin) / cell_size.y)
+    adjusted = {
+        key: (
+            leaf
+            if leaf.cell_size == cell_size and leaf.extent == extent
+            else AlignedSource(leaf, transform, width, height)
+        )
+        for key, leaf in leaves.items()
+    }
+
+    return [
+        LazyGrid(_replace(n.expression, adjusted)) if isinstance(n, LazyGrid) else n
+        for n in spatial
+    ]
@@ -179,6 +179,25 @@ ColorMap = Literal[
     "YlOrRd_r",
 ]
 
+ConvolutionBackend = Literal[
+    "auto",
+    "direct",
+    "fft",
+    "separable",
+]
+
+ConvolutionMode = Literal[
+    "normalize",
+    "propagate",
+    "zero",
+]
+
+DensityKernel = Literal[
+    "epanechnikov",
+    "gaussian",
+    "quartic",
+]
+
 DataType = Literal[
     "float32",
     "int8",
@@ -189,6 +208,11 @@ DataType = Literal[
     "uint32",
 ]
 
+ExecutorType = Literal[
+    "process",
+    "thread",
+]
+
 ExtentResolution = Literal[
     "first",
     "intersect",
@@ -218,3 +242,10 @@ ResamplingMethod = Literal[
     "cubic",
     "nearest",
 ]
+
+VariogramModel = Literal[
+    "exponential",
+    "gaussian",
+    "linear",
+    "spherical",
+]
@@ -1,14 +1,26 @@
-from dataclasses import dataclass
-from types import SimpleNamespace
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from math import ceil, floor
+from threading import Lock
 from typing import Dict, List, Optional, Tuple, overload
 
+import numpy as np
 import rasterio
+from numpy import ndarray
+from rasterio import DatasetReader
 from rasterio.crs import CRS
-from rasterio.transform import Affine, array_bounds
+from rasterio.transform import Affine, array_bounds, from_origin
+from rasterio.warp import Resampling, reproject
+from rasterio.windows import Window, from_bounds
+from shapely import STRtree, box
 
 from glidergun._grid import Grid, grid
 from glidergun._stack import Stack, stack
-from glidergun._types import Extent
+from glidergun._types import CellSize, Extent
+from glidergun._utils import create_directory
 
 
 @dataclass
@@ -18,40 +30,229 @@ class Profile:
     height: int
     width: int
     transform: Affine
+    dtype: str = "float32"
+    nodata: Optional[float] = None
+    mtime: float = 0
+
+    @property
+    def extent(self) -> Extent:
+        return Extent(*array_bounds(self.height, self.width, self.transform))
+
+    def to_json(self):
+        data = asdict(self)
+        del data["crs"]
+        return {**data, "transform": list(self.transform)[:6]}
+
+    @classmethod
+    def from_json(cls, data, crs: CRS):
+        return cls(**{**data, "crs": crs, "transform": Affine(*data["transform"])})
+
+
+def _scan(file: str) -> Profile:
+    with rasterio.open(file) as dataset:
+        return Profile(
+            dataset.count,
+            dataset.crs,
+            dataset.height,
+            dataset.width,
+            dataset.transform,
+            dataset.dtypes[0],
+            dataset.nodata,
+            os.path.getmtime(file),
+        )
+
+
+def _load_catalog(file: str) -> Dict[str, Profile]:
+    with open(file) as f:
+        catalog = json.load(f)
+    crs = CRS.from_wkt(catalog["crs"])
+    return {k: Profile.from_json(v, crs) for k, v in catalog["files"].items()}
+
+
+class _DatasetPool:
+    def __init__(self, max_open: int) -> None:
+        self.max_open = max_open
+        self.datasets: "OrderedDict[DatasetReader, str]" = OrderedDict()
+        self.lock = Lock()
+        self.pid = os.getpid()
+
+    def read(self, file: str, index: int, window: Window) -> ndarray:
+        dataset = self._checkout(file)
+        try:
+            return dataset.read(index, window=window)
+        finally:
+            self._checkin(file, dataset)
+
+    def _checkout(self, file: str) -> DatasetReader:
+        with self.lock:
+            if self.pid != os.getpid():
+                self.datasets.clear()
+                self.pid = os.getpid()
+            for dataset, name in reversed(self.datasets.items()):
+                if name == file:
+                    del self.datasets[dataset]
+                    return dataset
+        return rasterio.open(file)
+
+    def _checkin(self, file: str, dataset: DatasetReader) -> None:
+        with self.lock:
+            self.datasets[dataset] = file
+            excess = max(len(self.datasets) - self.max_open, 0)
+            evicted = [self.datasets.popitem(last=False)[0] for _ in range(excess)]
+        for d in evicted:
+            d.close()
+
+    def close(self) -> None:
+        with self.lock:
+            while self.datasets:
+                self.datasets.popitem()[0].close()
 
 
 class Mosaic:
-    def __init__(self, *files: str) -> None:
+    def __init__(
+        self,
+        *files: str,
+        index_file: Optional[str] = None,
+        max_open: int = 64,
+        max_workers: int = 8,
+    ) -> None:
         assert files, "No files provided"
-        profiles = list(self._read_profiles(*files))
-        count_set = {p.count for _, p in profiles}
-        crs_set = {p.crs for _, p in profiles}
+        cache = (
+            _load_catalog(index_file)
+            if index_file and os.path.exists(index_file)
+            else {}
+        )
+
+        def read(f: str) -> Profile:
+            p = cache.get(f)
+            return p if p and p.mtime == os.path.getmtime(f) else _scan(f)
+
+        with ThreadPoolExecutor(max_workers) as pool:
+            profiles = dict(zip(files, pool.map(read, files)))
+
+        self._initialize(profiles, max_open)
+
+        if index_file and profiles != {f: cache.get(f) for f in files}:
+            self.save(index_file)
+
+    def _initialize(self, profiles: Dict[str, Profile], max_open: int) -> None:
+        self.profiles = profiles
+        count_set = {p.count for p in profiles.values()}
+        crs_set = {p.crs for p in profiles.values()}
         assert len(count_set) == 1, "Inconsistent number of bands"
         assert len(crs_set) == 1, "Inconsistent CRS"
         self.crs = crs_set.pop()
-        self.files: Dict[str, Extent] = {
-            f: Extent(*array_bounds(p.height, p.width, p.transform))
-            for f, p in profiles
-        }
+        transform = next(iter(profiles.values())).transform
+        self.cell_size = CellSize(transform.a, -transform.e)
+        self.files: Dict[str, Extent] = {f: p.extent for f, p in profiles.items()}
         self.extent = Extent(
             min(e.xmin for e in self.files.values()),
             min(e.ymin for e in self.files.values()),
             max(e.xmax for e in self.files.values()),
             max(e.ymax for e in self.files.values()),
         )
+        self._names = list(self.files)
+        self._tree = STRtree([box(*e) for e in self.files.values()])
+        self._pool = _DatasetPool(max_open)
 
-    def _read_profiles(self, *files: str):
-        for f in files:
-            with rasterio.open(f) as dataset:
-                yield f, SimpleNamespace(**dataset.profile)
+    @classmethod
+    def load(cls, file: str, max_open: int = 64) -> "Mosaic":
+        m = cls.__new__(cls)
+        m._initialize(_load_catalog(file), max_open)
+        return m
+
+    def save(self, file: str) -> None:
+        create_directory(file)
+        catalog = {
+            "crs": self.crs.to_wkt(),
+            "files": {k: v.to_json() for k, v in self.profiles.items()},
+        }
+        with open(file, "w") as f:
+            json.dump(catalog, f, separators=(",", ":"))
+
+    def _query(self, extent: Extent) -> List[str]:
+        indices = np.sort(self._tree.query(box(*extent), "intersects"))
+        names = (self._names[i] for i in indices)
+        return [f for f in names if self.files[f].intersects(*extent)]
 
     def _read(self, extent: Tuple[float, float, float, float], index: int):
-        for f, e in self.files.items():
-            try:
-                if e.intersects(*extent):
-                    yield grid(f, extent, index=index)
-            except ValueError:
-                pass
+        request = Extent(*extent)
+        files = self._query(request)
+
+        if not files:
+            return None
+
+        e = request & self.files[files[0]]
+        for f in files[1:]:
+            e = e | (request & self.files[f])
+
+        width = round((e.xmax - e.xmin) / self.cell_size.x)
+        height = round((e.ymax - e.ymin) / self.cell_size.y)
+
+        if width == 0 or height == 0:
+            return None
+
+        transform = from_origin(e.xmin, e.ymax, *self.cell_size)
+        data = np.full((height, width), np.nan, dtype="float32")
+
+        for f in files:
+            self._paste(data, transform, f, index)
+
+        return grid(data, transform, self.crs)
+
+    def _paste(self, data: ndarray, transform: Affine, file: str, index: int):
+        p = self.profiles[file]
+        target = from_bounds(*self.files[file], transform)
+        col, row = ~p.transform * (transform.c, transform.f)
+        aligned = np.allclose(p.transform[:2], transform[:2]) and np.allclose(
+            (col, row), (round(col), round(row)), rtol=0, atol=1e-6
+        )
+
+        c0 = max(floor(target.col_off + 1e-6), 0)
+        r0 = max(floor(target.row_off + 1e-6), 0)
+        c1 = min(ceil(target.col_off + target.width - 1e-6), data.shape[1])
+        r1 = min(ceil(target.row_off + target.height - 1e-6), data.shape[0])
+
+        if c1 <= c0 or r1 <= r0:
+            return
+
+        destination = data[r0:r1, c0:c1]
+        transform = transform * Affine.translation(c0, r0)
+
+        if aligned:
+            col_off, row_off = round(col) + c0, round(row) + r0
+            window = Window(col_off, row_off, c1 - c0, r1 - r0)  # type: ignore
+        else:
+            bounds = array_bounds(r1 - r0, c1 - c0, transform)
+            w = from_bounds(*bounds, p.transform)  # type: ignore
+            sc0 = max(floor(w.col_off) - 1, 0)
+            sr0 = max(floor(w.row_off) - 1, 0)
+            sc1 = min(ceil(w.col_off + w.width) + 1, p.width)
+            sr1 = min(ceil(w.row_off + w.height) + 1, p.height)
+            window = Window(sc0, sr0, sc1 - sc0, sr1 - sr0)  # type: ignore
+
+        source = np.asarray(self._pool.read(file, index, window), dtype="float32")
+
+        if p.nodata is not None:
+            source[source == np.float32(p.nodata)] = np.nan
+
+        if not aligned:
+            warped = np.full(destination.shape, np.nan, dtype="float32")
+            reproject(
+                source=source,
+                destination=warped,
+                src_transform=p.transform
+                * Affine.translation(window.col_off, window.row_off),
+                src_crs=self.crs,
+                src_nodata=np.nan,
+                dst_transform=transform,
+                dst_crs=self.crs,
+                dst_nodata=np.nan,
+                resampling=Resampling.nearest,
+            )
+            source = warped
+
+        np.copyto(destination, source, where=np.isnan(destination))
 
     def tiles(
         self,
@@ -77,25 +278,35 @@ class Mosaic:
 
     def clip(self, xmin: float, ymin: float, xmax: float, ymax: float, index=None):
         if not index or isinstance(index, int):
-            grids: List[Grid] = [
-                g for g in self._read((xmin, ymin, xmax, ymax), index or 1) if g
-            ]
-            if grids:
-                return mosaic(*grids)
-            return None
+            return self._read((xmin, ymin, xmax, ymax), index or 1)
         return stack(*(self.clip(xmin, ymin, xmax, ymax, index=i) for i in index))
 
+    def close(self) -> None:
+        self._pool.close()
+
 
 @overload
-def mosaic(*grids: str) -> Mosaic: ...
+def mosaic(
+    *grids: str,
+    index_file: Optional[str] = None,
+    max_open: int = 64,
+    max_workers: int = 8,
+) -> Mosaic: ...
 
 
 @overload
 def mosaic(*grids: Grid) -> Grid: ...
 
 
-def mosaic(*grids):
+def mosaic(
+    *grids,
+    index_file: Optional[str] = None,
+    max_open: int = 64,
+    max_workers: int = 8,
+):
     g = grids[0]
     if isinstance(g, str):
-        return Mosaic(*grids)
+        return Mosaic(
+            *grids, index_file=index_file, max_open=max_open, max_workers=max_workers
+        )
     return g.mosaic(*grids[1:])
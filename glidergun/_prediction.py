@@ -1,13 +1,28 @@
 import pickle
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any, Callable, Generic, Protocol, TypeVar, Union, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Generic,
+    List,
+    Protocol,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
 
 import numpy as np
+from numpy import ndarray
+from rasterio.windows import Window
 
 from glidergun._literals import DataType, PredictorType
+from glidergun._tiling import process_tiles
 
 if TYPE_CHECKING:
     from glidergun._grid import Grid
+    from glidergun._lazy import LazyGrid
 
 
 class Predictor(Protocol):
@@ -69,34 +84,84 @@ class GridPredictor(Generic[TPredictor]):
         self._dtype: DataType = "float32"
 
     def fit(self, dependent_grid: "Grid", *explanatory_grids: "Grid", **kwargs: Any):
-        grids = self._flatten(*[dependent_grid, *explanatory_grids])
-        head, *tail = grids
-        self.model = self.model.fit(
-            np.array([g.data.ravel() for g in tail]).transpose(1, 0),
-            head.data.ravel(),
-            **kwargs,
-        )
+        """Fits the model to the cells where no grid is NaN."""
+        x, y = self._features(dependent_grid, *explanatory_grids)
+        self.model = self.model.fit(x, y, **kwargs)
         self._dtype = dependent_grid.dtype
         return self
 
     def score(self, dependent_grid: "Grid", *explanatory_grids: "Grid") -> float:
-        head, *tail = self._flatten(dependent_grid, *explanatory_grids)
-        return self.model.score(
-            np.array([g.data.ravel() for g in tail]).transpose(1, 0), head.data.ravel()
-        )
-
-    def predict(self, *explanatory_grids: "Grid", **kwargs: Any) -> "Grid":
-        grids = self._flatten(*explanatory_grids)
-        array = self.model.predict(
-            np.array([g.data.ravel() for g in grids]).transpose(1, 0), **kwargs
-        )
-        g = grids[0]
-        return g.local(array.reshape((g.height, g.width))).type(self._dtype)
+        """Scores the model on the cells where no grid is NaN."""
+        return self.model.score(*self._features(dependent_grid, *explanatory_grids))
 
-    def _flatten(self, *grids: "Grid"):
-        return [
-            g.is_nan().then(float(g.mean), g) for g in grids[0].standardize(*grids[1:])
+    def predict(
+        self,
+        *explanatory_grids: Union["Grid", "LazyGrid", str],
+        batch_size: int = 65536,
+        max_workers: int = 1,
+        tile_size: int = 1024,
+        **kwargs: Any,
+    ) -> "Grid":
+        """Predicts the dependent variable tile by tile.
+
+        Cells where any explanatory grid is NaN are not passed to the model and
+        are NaN in the output, just as they are excluded by ``fit`` and ``score``.
+
+        Args:
+            explanatory_grids: Grids, lazy grids or file paths in the same order
+                as they were used for fitting.
+            batch_size: Maximum number of cells passed to the model at a time.
+            max_workers: Number of tiles predicted in parallel.
+            tile_size: Tile width and height in cells.
+
+        Returns:
+            Grid: Predicted grid.
+        """
+        from glidergun._grid import Grid, grid, standardize
+
+        sources = [
+            grid(s, lazy=True) if isinstance(s, str) else s for s in explanatory_grids
         ]
+        if all(isinstance(s, Grid) for s in sources):
+            sources = list(standardize(*cast(List[Grid], sources)))
+
+        head, *tail = sources
+        cell_size = head.cell_size
+
+        def read(source: Union["Grid", "LazyGrid"], tile: "Grid") -> ndarray:
+            size = (source.width, source.height)
+            if source.transform != head.transform or size != (head.width, head.height):
+                clipped = source.clip(*tile.extent)
+                _, t = standardize(tile, clipped, extent="first", cell_size=cell_size)
+                return t.data
+            col = round((tile.xmin - head.extent.xmin) / cell_size.x)
+            row = round((head.extent.ymax - tile.ymax) / cell_size.y)
+            if isinstance(source, Grid):
+                return source.data[row : row + tile.height, col : col + tile.width]
+            window = Window(col, row, tile.width, tile.height)  # type: ignore
+            return source.read(window).data
+
+        def f(tile: "Grid") -> "Grid":
+            arrays = [tile.data, *(read(source, tile) for source in tail)]
+            features = np.column_stack([a.ravel() for a in arrays])
+            index = np.flatnonzero(~np.isnan(features).any(axis=1))
+            result = np.full(len(features), np.nan, dtype="float32")
+            for start in range(0, len(index), batch_size):
+                rows = index[start : start + batch_size]
+                result[rows] = self.model.predict(features[rows], **kwargs)
+            return tile.local(result.reshape(tile.data.shape))
+
+        result = process_tiles(head, f, None, tile_size, 0, max_workers, verbose=False)
+        if self._dtype.startswith("float") or result.has_nan:
+            return result
+        return result.type(self._dtype)
+
+    def _features(self, *grids: "Grid") -> Tuple[ndarray, ndarray]:
+        head, *tail = grids[0].standardize(*grids[1:])
+        x = np.column_stack([g.data.ravel() for g in tail])
+        y = head.data.ravel()
+        valid = ~(np.isnan(x).any(axis=1) | np.isnan(y))
+        return x[valid], y[valid]
 
     def save(self, file: str):
         with open(file, "wb") as f:
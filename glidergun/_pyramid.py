@@ -0,0 +1,269 @@
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+from math import ceil, log2
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from numpy import ndarray
+from rasterio.warp import transform_bounds
+
+from glidergun._rendering import (
+    colorize,
+    compose,
+    downsample,
+    encode_png,
+    value_range,
+)
+from glidergun._utils import create_directory
+
+if TYPE_CHECKING:
+    from glidergun._grid import Grid
+    from glidergun._stack import Stack
+
+WORLD = 20037508.342789244
+CACHE_SIZE = 4
+
+
+class TilePyramid:
+    """XYZ (slippy map) tiles of a grid or stack in Web Mercator.
+
+    The data is reprojected and its overviews are computed once.  Tiles are
+    rendered on demand, optionally cached on disk, and can be served to web maps
+    by a local tile server.
+    """
+
+    def __init__(
+        self,
+        obj: Union["Grid", "Stack"],
+        directory: Optional[str] = None,
+        tile_size: int = 256,
+    ):
+        from glidergun._stack import Stack
+
+        projected = _web_mercator(obj)
+        self.directory = directory
+        self.tile_size = tile_size
+        self.extent = projected.extent
+        self.bounds = transform_bounds(3857, 4326, *self.extent)
+
+        if isinstance(projected, Stack):
+            bands = [
+                projected.grids[i - 1]
+                for i in (projected.display if projected.display else (1, 2, 3))
+            ]
+            self._cmap = None
+        else:
+            bands = [projected]
+            self._cmap = projected.display
+
+        self._ranges = [value_range(b.data) for b in bands]
+        self._levels: List[Tuple[float, float, List[ndarray]]] = []
+        arrays = [b.data for b in bands]
+        cell_x, cell_y = bands[0].cell_size
+
+        while True:
+            self._levels.append((cell_x, cell_y, arrays))
+            if max(arrays[0].shape) <= tile_size:
+                break
+            arrays = [downsample(a, 2) for a in arrays]
+            cell_x, cell_y = 2 * cell_x, 2 * cell_y
+
+        self.max_zoom = max(
+            0, ceil(log2(2 * WORLD / (tile_size * bands[0].cell_size.x)))
+        )
+        self.min_zoom = max(0, self.max_zoom - len(self._levels) + 1)
+        self._empty = encode_png(np.zeros((tile_size, tile_size, 4), dtype="uint8"))
+        self._key: Optional[int] = None
+
+    def tile(self, z: int, x: int, y: int) -> Optional[bytes]:
+        """Returns the PNG tile at (z, x, y), or None if it does not overlap the data."""
+        file = (
+            Path(self.directory, str(z), str(x), f"{y}.png") if self.directory else None
+        )
+        if file and file.exists():
+            return file.read_bytes()
+
+        size = 2 * WORLD / 2**z
+        xmin, ymax = -WORLD + x * size, WORLD - y * size
+        e = self.extent
+        if (
+            xmin >= e.xmax
+            or xmin + size <= e.xmin
+            or ymax <= e.ymin
+            or ymax - size >= e.ymax
+        ):
+            return None
+
+        resolution = size / self.tile_size
+        cell_x, cell_y, arrays = self._levels[0]
+        for level in self._levels:
+            if level[0] > resolution * (1 + 1e-9):
+                break
+            cell_x, cell_y, arrays = level
+
+        centers = (np.arange(self.tile_size) + 0.5) * resolution
+        cols = np.floor((xmin + centers - e.xmin) / cell_x).astype("int64")
+        rows = np.floor((e.ymax - ymax + centers) / cell_y).astype("int64")
+        height, width = arrays[0].shape
+        valid = ((rows >= 0) & (rows < height))[:, None] & (
+            (cols >= 0) & (cols < width)
+        )
+        index = np.ix_(rows.clip(0, height - 1), cols.clip(0, width - 1))
+        samples = [np.where(valid, a[index], np.nan) for a in arrays]
+
+        if self._cmap is None:
+            rgba = compose(samples, self._ranges)
+        else:
+            rgba = colorize(samples[0], self._cmap, *self._ranges[0][:2])
+            rgba[~valid] = 0
+
+        png = encode_png(rgba)
+        if file:
+            create_directory(str(file))
+            file.write_bytes(png)
+        return png
+
+    def tiles(self, zoom: int) -> List[Tuple[int, int]]:
+        n = 2**zoom
+        size = 2 * WORLD / n
+        e = self.extent
+        x0, x1 = int((e.xmin + WORLD) // size), int((e.xmax + WORLD) // size)
+        y0, y1 = int((WORLD - e.ymax) // size), int((WORLD - e.ymin) // size)
+        return [
+            (x, y)
+            for x in range(max(0, x0), min(n - 1, x1) + 1)
+            for y in range(max(0, y0), min(n - 1, y1) + 1)
+        ]
+
+    def save(self, min_zoom: Optional[int] = None, max_zoom: Optional[int] = None):
+        """Renders every tile between the zoom levels into the cache directory."""
+        if not self.directory:
+            raise ValueError("A directory is required to save tiles.")
+        for z in range(
+            self.min_zoom if min_zoom is None else min_zoom,
+            (self.max_zoom if max_zoom is None else max_zoom) + 1,
+        ):
+            for x, y in self.tiles(z):
+                self.tile(z, x, y)
+
+    def serve(self, port: int = 0) -> str:
+        """Serves the tiles from the shared local tile server and returns the XYZ
+        URL template.  The server is started on ``port`` if it is not running."""
+        if self._key is None or _server.pyramids.get(self._key) is not self:
+            self._key = _server.add(self, port)
+        return f"{_server.url}/{self._key}/{{z}}/{{x}}/{{y}}.png"
+
+    def close(self):
+        """Stops serving the tiles.  The server stops when it has nothing to serve."""
+        if self._key is not None:
+            _server.remove(self._key)
+            self._key = None
+
+    @classmethod
+    def cached(cls, obj: Union["Grid", "Stack"]) -> "TilePyramid":
+        """Returns the pyramid of a grid or stack, reusing it while the object is
+        alive.  Only the most recently used pyramids are kept; older ones are
+        closed."""
+        key = id(obj)
+        entry = _cache.get(key)
+        if entry is not None and entry[0]() is obj:
+            _cache.move_to_end(key)
+            return entry[1]
+        pyramid = cls(obj)
+        _cache[key] = (weakref.ref(obj, lambda _: _evict(key, pyramid)), pyramid)
+        while len(_cache) > CACHE_SIZE:
+            _, (_, evicted) = _cache.popitem(last=False)
+            evicted.close()
+        return pyramid
+
+    @classmethod
+    def close_all(cls):
+        """Closes every cached pyramid and stops the shared tile server."""
+        while _cache:
+            _, (_, pyramid) = _cache.popitem()
+            pyramid.close()
+        _server.stop()
+
+
+class _TileServer:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.pyramids: Dict[int, TilePyramid] = {}
+        self.keys = count(1)
+        self.server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        assert self.server is not None
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def add(self, pyramid: TilePyramid, port: int) -> int:
+        with self.lock:
+            key = next(self.keys)
+            self.pyramids[key] = pyramid
+            if self.server is None:
+                self.server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+                self.server.daemon_threads = True
+                threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            return key
+
+    def remove(self, key: int):
+        with self.lock:
+            self.pyramids.pop(key, None)
+            empty = not self.pyramids
+        if empty:
+            self.stop()
+
+    def stop(self):
+        with self.lock:
+            server, self.server = self.server, None
+            self.pyramids.clear()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        match = re.fullmatch(r"/(\d+)/(\d+)/(\d+)/(\d+)\.png", self.path)
+        key, z, x, y = map(int, match.groups()) if match else (0, 0, 0, 0)
+        pyramid = _server.pyramids.get(key)
+        if pyramid is None:
+            self.send_error(404)
+            return
+        png = pyramid.tile(z, x, y) or pyramid._empty
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(png)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "max-age=3600")
+        self.end_headers()
+        self.wfile.write(png)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = _TileServer()
+_cache: "OrderedDict[int, Tuple[weakref.ref, TilePyramid]]" = OrderedDict()
+
+
+def _evict(key: int, pyramid: TilePyramid):
+    entry = _cache.get(key)
+    if entry is not None and entry[1] is pyramid:
+        del _cache[key]
+    pyramid.close()
+
+
+def _web_mercator(obj: Union["Grid", "Stack"]) -> Union["Grid", "Stack"]:
+    xmin, ymin, xmax, ymax = transform_bounds(obj.crs, 4326, *obj.extent)
+    if ymin >= -85 and ymax <= 85:
+        return obj.project(3857)
+    return (
+        obj.project(4326).clip(xmin, max(ymin, -85), xmax, min(ymax, 85)).project(3857)
+    )
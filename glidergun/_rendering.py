@@ -0,0 +1,103 @@
+from io import BytesIO
+from math import ceil
+from typing import Any, List, Optional, Tuple
+
+import matplotlib
+import numpy as np
+from numpy import ndarray
+from PIL import Image
+
+
+def thumbnail(
+    data: ndarray, cmap: Any, figsize: Optional[Tuple[float, float]] = None
+) -> bytes:
+    data = resize(data, *_pixel_size(figsize))
+    lo, hi, _ = value_range(data)
+    return encode_png(colorize(data, cmap, lo, hi))
+
+
+def rgb_thumbnail(
+    bands: List[ndarray], figsize: Optional[Tuple[float, float]] = None
+) -> bytes:
+    bands = [resize(b, *_pixel_size(figsize)) for b in bands]
+    return encode_png(compose(bands, [value_range(b) for b in bands]))
+
+
+def value_range(data: ndarray) -> Tuple[float, float, bool]:
+    values = np.asarray(data, dtype="float32")
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return 0.0, 0.0, False
+    lo, hi = float(values.min()), float(values.max())
+    if data.dtype == "bool" or lo > 0 and hi < 255:
+        return lo, hi, False
+    p_lo, p_hi = np.percentile(values, [0.1, 99.9])
+    if p_lo != p_hi:
+        return float(p_lo), float(p_hi), True
+    return lo, hi, True
+
+
+def colorize(data: ndarray, cmap: Any, lo: float, hi: float) -> ndarray:
+    colormap = matplotlib.colormaps.get_cmap(cmap)
+    lut = colormap((np.arange(256) + 0.5) / 256, bytes=True)
+    values = np.asarray(data, dtype="float32")
+    valid = np.isfinite(values)
+    scale = 256 / (hi - lo) if hi > lo else 0
+    index = np.clip((np.where(valid, values, lo) - lo) * scale, 0, 255)
+    rgba = lut[index.astype("uint8")]
+    rgba[~valid] = colormap(np.nan, bytes=True)
+    return rgba
+
+
+def compose(bands: List[ndarray], ranges: List[Tuple[float, float, bool]]) -> ndarray:
+    values = [np.asarray(b, dtype="float32") for b in bands]
+    valid = np.isfinite(values[0] + values[1] + values[2])
+    rgb = [
+        np.where(valid, _uint8_range(v, *r), 0).astype("uint8")
+        for v, r in zip(values, ranges)
+    ]
+    return np.dstack([*rgb, np.where(valid, 255, 0).astype("uint8")])
+
+
+def encode_png(rgba: ndarray) -> bytes:
+    with BytesIO() as buffer:
+        Image.fromarray(rgba, "RGBA").save(buffer, format="PNG", compress_level=1)
+        return buffer.getvalue()
+
+
+def resize(data: ndarray, width: int, height: int) -> ndarray:
+    h, w = data.shape
+    factor = ceil(max(w / width, h / height))
+    if factor > 1:
+        return downsample(data, factor)
+    repeat = max(1, min(width // w, height // h))
+    return np.repeat(np.repeat(data, repeat, axis=0), repeat, axis=1)
+
+
+def downsample(data: ndarray, factor: int) -> ndarray:
+    if data.dtype.kind != "f":
+        return data[factor // 2 :: factor, factor // 2 :: factor]
+    h, w = data.shape
+    rows, cols = -(-h // factor), -(-w // factor)
+    padded = np.full((rows * factor, cols * factor), np.nan, dtype="float32")
+    padded[:h, :w] = data
+    blocks = padded.reshape(rows, factor, cols, factor)
+    valid = np.isfinite(blocks)
+    count = valid.sum(axis=(1, 3))
+    total = np.where(valid, blocks, 0).sum(axis=(1, 3))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return total / count
+
+
+def _pixel_size(figsize: Optional[Tuple[float, float]]) -> Tuple[int, int]:
+    width, height = figsize or matplotlib.rcParams["figure.figsize"]
+    dpi = matplotlib.rcParams["figure.dpi"]
+    return max(1, round(width * dpi)), max(1, round(height * dpi))
+
+
+def _uint8_range(values: ndarray, lo: float, hi: float, stretched: bool) -> ndarray:
+    if not stretched:
+        return values
+    if hi == lo:
+        return np.full_like(values, 127.5)
+    return (np.clip(values, lo, hi) - lo) * (253 / (hi - lo)) + 1
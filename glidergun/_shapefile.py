@@ -4,6 +4,7 @@ from typing import TYPE_CHECKING, cast
 import fiona
 from shapely.geometry import Point, mapping
 
+from glidergun._types import Defaults
 from glidergun._utils import create_directory
 
 if TYPE_CHECKING:
@@ -20,7 +21,11 @@ class Shapefile:
             shapes = grid.to_polygons()
         else:
             geometry = "Point"
-            shapes = [(Point(x, y), value) for x, y, value in grid.to_points()]
+            shapes = (
+                (Point(x, y), float(value))
+                for chunk in grid.to_arrays(chunk_size=Defaults.block_size)
+                for x, y, value in zip(*chunk)
+            )
 
         schema = {"geometry": geometry, "properties": {"id": "int", "value": "float"}}
 
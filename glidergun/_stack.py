@@ -2,12 +2,9 @@ import dataclasses
 from base64 import b64encode
 from dataclasses import dataclass
 from functools import cached_property
-from io import BytesIO
 from typing import Any, Callable, Iterator, List, Optional, Tuple, Union, overload
 
-import numpy as np
 import rasterio
-from matplotlib import pyplot as plt
 from rasterio import DatasetReader
 from rasterio.crs import CRS
 from rasterio.drivers import driver_from_extension
@@ -24,6 +21,7 @@ from glidergun._grid import (
     standardize,
 )
 from glidergun._literals import BaseMap, DataType
+from glidergun._rendering import rgb_thumbnail
 from glidergun._types import Scaler
 from glidergun._utils import create_directory, get_crs, get_nodata_value
 
@@ -40,20 +38,11 @@ class Stack:
         return f"crs: {g.crs} | count: {len(self.grids)} | rgb: {self.display}"
 
     def _thumbnail(self, figsize: Optional[Tuple[float, float]] = None):
-        with BytesIO() as buffer:
-            figure = plt.figure(figsize=figsize, frameon=False)
-            axes = figure.add_axes((0, 0, 1, 1))
-            axes.axis("off")
-            obj = self.to_uint8_range()
-            rgb = [
-                obj.grids[i - 1].data
-                for i in (self.display if self.display else (1, 2, 3))
-            ]
-            alpha = np.where(np.isfinite(rgb[0] + rgb[1] + rgb[2]), 255, 0)
-            plt.imshow(np.dstack([*[np.asanyarray(g, "uint8") for g in rgb], alpha]))
-            plt.savefig(buffer, bbox_inches="tight", pad_inches=0)
-            plt.close(figure)
-            return buffer.getvalue()
+        bands = [
+            self.grids[i - 1].data
+            for i in (self.display if self.display else (1, 2, 3))
+        ]
+        return rgb_thumbnail(bands, figsize)
 
     @cached_property
     def img(self) -> str:
@@ -224,12 +213,21 @@ class Stack:
         height: int = 600,
         attribution: Optional[str] = None,
         grayscale: bool = True,
+        tiles: bool = False,
         **kwargs,
     ):
         from glidergun._display import get_folium_map
 
         return get_folium_map(
-            self, opacity, basemap, width, height, attribution, grayscale, **kwargs
+            self,
+            opacity,
+            basemap,
+            width,
+            height,
+            attribution,
+            grayscale,
+            tiles,
+            **kwargs,
         )
 
     def each(self, func: Callable[[Grid], Grid]):
@@ -0,0 +1,124 @@
+from dataclasses import dataclass
+from functools import cached_property
+from typing import TYPE_CHECKING, Callable, Sequence, Tuple, Union, cast
+
+import numpy as np
+from numpy import ndarray
+
+from glidergun._types import Defaults
+
+if TYPE_CHECKING:
+    from glidergun._grid import Grid
+    from glidergun._stack import Stack
+
+
+@dataclass(frozen=True)
+class Terrain:
+    @cached_property
+    def _gradient(self) -> Tuple[ndarray, ndarray]:
+        x = np.empty(cast("Grid", self).data.shape, dtype="float32")
+        y = np.empty_like(x)
+
+        for rows, z, dx, dy in _blocks(cast("Grid", self)):
+            a, b, c = z[:-2, :-2], z[:-2, 1:-1], z[:-2, 2:]
+            d, f = z[1:-1, :-2], z[1:-1, 2:]
+            g, h, i = z[2:, :-2], z[2:, 1:-1], z[2:, 2:]
+            x[rows] = ((c + 2 * f + i) - (a + 2 * d + g)) / (8 * dx)
+            y[rows] = ((g + 2 * h + i) - (a + 2 * b + c)) / (8 * dy)
+
+        return x, y
+
+    def _terrain(self, func: Callable[["Grid"], "Grid"], max_workers: int) -> "Grid":
+        grid = cast("Grid", self)
+        if max_workers <= 1:
+            return func(grid)
+        tile_size = -(-max(grid.width, grid.height) // max_workers)
+        return grid.process_tiles(func, tile_size, 1, max_workers)
+
+    def aspect(self, radians: bool = False, max_workers: int = 1) -> "Grid":
+        def f(g: "Grid") -> "Grid":
+            x, y = g._gradient
+            aspect = np.arctan2(-y, x)
+            return g.local(aspect if radians else np.degrees(aspect) % 360)
+
+        return self._terrain(f, max_workers)
+
+    def slope(self, radians: bool = False, max_workers: int = 1) -> "Grid":
+        def f(g: "Grid") -> "Grid":
+            slope = np.arctan(np.hypot(*g._gradient))
+            return g.local(slope if radians else np.degrees(slope))
+
+        return self._terrain(f, max_workers)
+
+    def hillshade(
+        self, azimuth: float = 315, altitude: float = 45, max_workers: int = 1
+    ) -> "Grid":
+        azimuth = np.deg2rad(azimuth)
+        altitude = np.deg2rad(altitude)
+
+        def f(g: "Grid") -> "Grid":
+            x, y = g._gradient
+            shaded = (
+                np.sin(altitude)
+                + np.cos(altitude) * (np.cos(azimuth) * x - np.sin(azimuth) * y)
+            ) / np.sqrt(1 + x * x + y * y)
+            return g.local(np.float32(127.5) * (shaded + 1))
+
+        return self._terrain(f, max_workers)
+
+    def hillshade_many(
+        self,
+        azimuths: Union[float, Sequence[float]],
+        altitudes: Union[float, Sequence[float]] = 45,
+    ) -> "Stack":
+        from glidergun._stack import stack
+
+        grid = cast("Grid", self)
+        azimuth, altitude = np.broadcast_arrays(
+            np.deg2rad(np.ravel(azimuths)), np.deg2rad(np.ravel(altitudes))
+        )
+        coefficients = 127.5 * np.column_stack(
+            [
+                np.sin(altitude),
+                np.cos(altitude) * np.cos(azimuth),
+                -np.cos(altitude) * np.sin(azimuth),
+            ]
+        )
+        x, y = grid._gradient
+        inverse = 1 / np.sqrt(1 + x * x + y * y)
+        terms = np.stack([inverse, x * inverse, y * inverse])
+        shaded = np.tensordot(coefficients.astype("float32"), terms, 1) + 127.5
+        return stack(*(grid.local(s) for s in shaded))
+
+    def curvature(self, max_workers: int = 1) -> "Grid":
+        def f(g: "Grid") -> "Grid":
+            result = np.empty(g.data.shape, dtype="float32")
+            for rows, z, dx, dy in _blocks(g):
+                center = z[1:-1, 1:-1]
+                d = ((z[1:-1, :-2] + z[1:-1, 2:]) / 2 - center) / (dx * dx)
+                e = ((z[:-2, 1:-1] + z[2:, 1:-1]) / 2 - center) / (dy * dy)
+                result[rows] = -200 * (d + e)
+            return g.local(result)
+
+        return self._terrain(f, max_workers)
+
+
+def _blocks(grid: "Grid"):
+    z = np.pad(grid.data, 1, mode="edge")
+    dx, dy = _cell_dimensions(grid)
+    step = max(1, Defaults.block_size // grid.width)
+    for start in range(0, grid.height, step):
+        rows = slice(start, start + step)
+        block = np.asarray(z[start : start + step + 2], dtype="float64")
+        yield rows, block, dx[rows], dy[rows]
+
+
+def _cell_dimensions(grid: "Grid") -> Tuple[ndarray, ndarray]:
+    x = np.full((grid.height, 1), grid.cell_size.x)
+    y = np.full((grid.height, 1), grid.cell_size.y)
+    if not grid.crs.is_geographic:
+        return x, y
+    latitude = np.radians(grid._ys())[:, None]
+    meters_x = 111412.84 * np.cos(latitude) - 93.5 * np.cos(3 * latitude)
+    meters_y = 111132.92 - 559.82 * np.cos(2 * latitude) + 1.175 * np.cos(4 * latitude)
+    return x * meters_x, y * meters_y
@@ -0,0 +1,463 @@
+import multiprocessing
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    overload,
+)
+
+import numpy as np
+import rasterio
+from numpy import ndarray
+from rasterio import DatasetReader
+from rasterio.crs import CRS
+from rasterio.drivers import driver_from_extension
+from rasterio.transform import Affine, from_origin
+from rasterio.windows import Window
+
+from glidergun._literals import DataType, ExecutorType
+from glidergun._types import CellSize, Extent
+from glidergun._utils import create_directory, get_nodata_value
+
+if TYPE_CHECKING:
+    from glidergun._grid import Grid
+    from glidergun._lazy import LazyGrid
+    from glidergun._mosaic import Mosaic
+
+Source = Union[str, DatasetReader, "Grid", "LazyGrid", "Mosaic"]
+
+
+class Tile(NamedTuple):
+    core: Window
+    halo: Window
+
+
+class _Reader(ABC):
+    width: int
+    height: int
+    transform: Affine
+    crs: CRS
+
+    @property
+    def cell_size(self) -> CellSize:
+        return CellSize(self.transform.a, -self.transform.e)
+
+    def extent(self, window: Window) -> Extent:
+        xmin, ymax = self.transform * (window.col_off, window.row_off)
+        xmax, ymin = self.transform * (
+            window.col_off + window.width,
+            window.row_off + window.height,
+        )
+        return Extent(xmin, ymin, xmax, ymax)
+
+    @abstractmethod
+    def read(self, window: Window) -> "Grid": ...
+
+
+class _GridReader(_Reader):
+    def __init__(self, grid: "Grid") -> None:
+        self.grid = grid
+        self.width = grid.width
+        self.height = grid.height
+        self.transform = grid.transform
+        self.crs = grid.crs
+
+    def read(self, window: Window) -> "Grid":
+        from glidergun._grid import grid
+
+        (r0, r1), (c0, c1) = window.toranges()
+        transform = self.transform * Affine.translation(c0, r0)
+        return grid(self.grid.data[r0:r1, c0:c1], transform, self.crs)
+
+
+class _LazyReader(_Reader):
+    def __init__(self, lazy: "LazyGrid") -> None:
+        self.lazy = lazy
+        self.width = lazy.width
+        self.height = lazy.height
+        self.transform = lazy.transform
+        self.crs = lazy.crs
+
+    def read(self, window: Window) -> "Grid":
+        return self.lazy.read(window)
+
+
+class _DatasetReader(_Reader):
+    def __init__(self, dataset: DatasetReader, index: int) -> None:
+        self.dataset = dataset
+        self.index = index
+        self.width = dataset.width
+        self.height = dataset.height
+        self.transform = dataset.transform
+        self.crs = dataset.crs
+        self.lock = Lock()
+        self.pid = os.getpid()
+
+    def read(self, window: Window) -> "Grid":
+        from glidergun._grid import grid
+
+        if self.pid != os.getpid():
+            self.dataset = rasterio.open(self.dataset.name)
+            self.pid = os.getpid()
+
+        with self.lock:
+            data = self.dataset.read(self.index, window=window)
+        g = grid(data, self.dataset.window_transform(window), self.crs)
+        return g if self.dataset.nodata is None else g.set_nan(self.dataset.nodata)
+
+
+class _MosaicReader(_Reader):
+    def __init__(self, mosaic: "Mosaic", index: int) -> None:
+        self.mosaic = mosaic
+        self.index = index
+        cell_size = mosaic.cell_size
+        self.width = round((mosaic.extent.xmax - mosaic.extent.xmin) / cell_size.x)
+        self.height = round((mosaic.extent.ymax - mosaic.extent.ymin) / cell_size.y)
+        self.transform = from_origin(
+            mosaic.extent.xmin, mosaic.extent.ymax, cell_size.x, cell_size.y
+        )
+        self.crs = mosaic.crs
+
+    def read(self, window: Window) -> "Grid":
+        from glidergun._grid import grid
+
+        extent = self.extent(window)
+        g = self.mosaic.clip(*extent, index=self.index)
+        if g is None:
+            return grid(np.nan, extent, self.crs, self.cell_size)
+        return g if g.extent == extent else g.clip(*extent)
+
+
+class _Writer(ABC):
+    def __init__(self, reader: _Reader) -> None:
+        self.reader = reader
+        self.lock = Lock()
+
+    def write(self, tile: Tile, g: "Grid") -> None:
+        overlap = _overlap(tile.core, g, self.reader.transform)
+        if overlap:
+            target, source = overlap
+            self._write(target, g.data[source])
+
+    @abstractmethod
+    def _write(self, target: Window, data: ndarray) -> None: ...
+
+
+class _ArrayWriter(_Writer):
+    data: Optional[ndarray] = None
+    shared: bool = False
+    memory: Optional[SharedMemory] = None
+
+    def _write(self, target: Window, data: ndarray) -> None:
+        with self.lock:
+            if self.data is None:
+                self.data = self._allocate(data.dtype)
+                self.data.fill(np.nan if data.dtype.kind == "f" else 0)
+            elif (dtype := np.result_type(self.data, data)) != self.data.dtype:
+                if self.shared:
+                    raise TypeError(
+                        f"A tile of type {data.dtype} cannot be stored in the "
+                        f"{self.data.dtype} result of the process executor.  "
+                        "Return the same type from every tile."
+                    )
+                self.data = self.data.astype(dtype)
+            (r0, r1), (c0, c1) = target.toranges()
+            self.data[r0:r1, c0:c1] = data
+
+    def _allocate(self, dtype: Any) -> ndarray:
+        shape = (self.reader.height, self.reader.width)
+        if not self.shared:
+            return np.empty(shape, dtype=dtype)
+        size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        self.memory = SharedMemory(create=True, size=size)
+        return np.ndarray(shape, dtype=dtype, buffer=self.memory.buf)
+
+    def result(self) -> "Grid":
+        from glidergun._grid import grid
+
+        assert self.data is not None
+        if self.memory is None:
+            return grid(self.data, self.reader.transform, self.reader.crs)
+        data = self.data.copy()
+        self.close()
+        return grid(data, self.reader.transform, self.reader.crs)
+
+    def close(self) -> None:
+        if self.memory is not None:
+            self.data = None
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+
+class _FileWriter(_Writer):
+    dataset = None
+
+    def __init__(
+        self, reader: _Reader, file: str, dtype: Optional[DataType], driver: str
+    ) -> None:
+        super().__init__(reader)
+        self.file = file
+        self.dtype = dtype
+        self.driver = driver
+
+    def _write(self, target: Window, data: ndarray) -> None:
+        with self.lock:
+            if self.dataset is None:
+                self.dtype = self.dtype or (
+                    "int32" if data.dtype == "bool" else str(data.dtype)  # type: ignore
+                )
+                self.nodata = get_nodata_value(self.dtype)  # type: ignore
+                create_directory(self.file)
+                self.dataset = rasterio.open(
+                    self.file,
+                    "w",
+                    driver=self.driver or driver_from_extension(self.file),
+                    count=1,
+                    dtype=self.dtype,
+                    nodata=self.nodata,
+                    height=self.reader.height,
+                    width=self.reader.width,
+                    crs=self.reader.crs,
+                    transform=self.reader.transform,
+                )
+            if self.nodata is not None and data.dtype.kind == "f":
+                data = np.where(np.isnan(data), self.nodata, data)
+            self.dataset.write(np.asanyarray(data, dtype=self.dtype), 1, window=target)
+
+    def close(self) -> None:
+        if self.dataset is not None:
+            self.dataset.close()
+
+
+def tiles(width: int, height: int, tile_size: int, buffer: int) -> List[Tile]:
+    results = []
+    for row in range(0, height, tile_size):
+        for col in range(0, width, tile_size):
+            w, h = min(tile_size, width - col), min(tile_size, height - row)
+            core = Window(col, row, w, h)  # type: ignore
+            r0, c0 = max(row - buffer, 0), max(col - buffer, 0)
+            r1 = min(row + core.height + buffer, height)
+            c1 = min(col + core.width + buffer, width)
+            halo = Window(c0, r0, c1 - c0, r1 - r0)  # type: ignore
+            results.append(Tile(core, halo))
+    return results
+
+
+def _overlap(
+    core: Window, g: "Grid", transform: Affine
+) -> Optional[Tuple[Window, Tuple[slice, slice]]]:
+    cell_x, cell_y = transform.a, -transform.e
+    if not np.allclose(g.cell_size, (cell_x, cell_y)):
+        raise ValueError("Tile results must have the same cell size as the source.")
+    col = round((g.xmin - transform.c) / cell_x)
+    row = round((transform.f - g.ymax) / cell_y)
+    c0 = max(col, core.col_off)
+    r0 = max(row, core.row_off)
+    c1 = min(col + g.width, core.col_off + core.width)
+    r1 = min(row + g.height, core.row_off + core.height)
+    if c1 <= c0 or r1 <= r0:
+        return None
+    source = (slice(r0 - row, r1 - row), slice(c0 - col, c1 - col))
+    return Window(c0, r0, c1 - c0, r1 - r0), source  # type: ignore
+
+
+_task: Optional[Tuple[_Reader, _Writer, Callable[["Grid"], "Grid"]]] = None
+
+
+def _process_tile(tile: Tile):
+    assert _task
+    reader, writer, func = _task
+    g = func(reader.read(tile.halo))
+    if isinstance(writer, _ArrayWriter):
+        writer.write(tile, g)
+        return None
+    overlap = _overlap(tile.core, g, reader.transform)
+    if overlap:
+        target, source = overlap
+        return target, g.data[source]
+    return None
+
+
+def _execute_in_processes(
+    reader: _Reader,
+    writer: _Writer,
+    func: Callable[["Grid"], "Grid"],
+    items: List[Tile],
+    max_workers: int,
+) -> None:
+    global _task
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        raise ValueError("The process executor requires the 'fork' start method.")
+
+    if isinstance(writer, _ArrayWriter):
+        writer.shared = True
+
+    writer.write(items[0], func(reader.read(items[0].halo)))
+    _task = (reader, writer, func)
+
+    try:
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers, context) as pool:
+            for result in pool.map(_process_tile, items[1:]):
+                if result:
+                    writer._write(*result)
+    finally:
+        _task = None
+
+
+def _execute(
+    reader: _Reader,
+    writer: _Writer,
+    func: Callable[["Grid"], "Grid"],
+    tile_size: int,
+    buffer: int,
+    max_workers: int,
+    executor: ExecutorType,
+    verbose: bool = True,
+) -> None:
+    items = tiles(reader.width, reader.height, tile_size, buffer)
+
+    def f(tile: Tile):
+        writer.write(tile, func(reader.read(tile.halo)))
+
+    if max_workers > 1 and executor == "process":
+        _execute_in_processes(reader, writer, func, items, max_workers)
+    elif max_workers > 1:
+        with ThreadPoolExecutor(max_workers) as pool:
+            list(pool.map(f, items))
+    else:
+        for i, tile in enumerate(items):
+            if verbose:
+                print(f"Processing tile {i + 1} of {len(items)}...")
+            f(tile)
+
+
+@overload
+def process_tiles(
+    source: Source,
+    func: Callable[["Grid"], "Grid"],
+    output: None = None,
+    tile_size: int = 256,
+    buffer: int = 0,
+    max_workers: int = 1,
+    index: int = 1,
+    dtype: Optional[DataType] = None,
+    driver: str = "",
+    executor: ExecutorType = "thread",
+    verbose: bool = True,
+) -> "Grid": ...
+
+
+@overload
+def process_tiles(
+    source: Source,
+    func: Callable[["Grid"], "Grid"],
+    output: str,
+    tile_size: int = 256,
+    buffer: int = 0,
+    max_workers: int = 1,
+    index: int = 1,
+    dtype: Optional[DataType] = None,
+    driver: str = "",
+    executor: ExecutorType = "thread",
+    verbose: bool = True,
+) -> None: ...
+
+
+def process_tiles(
+    source: Source,
+    func: Callable[["Grid"], "Grid"],
+    output: Optional[str] = None,
+    tile_size: int = 256,
+    buffer: int = 0,
+    max_workers: int = 1,
+    index: int = 1,
+    dtype: Optional[DataType] = None,
+    driver: str = "",
+    executor: ExecutorType = "thread",
+    verbose: bool = True,
+):
+    """Applies a function to a raster tile by tile without loading it into memory.
+
+    Args:
+        source: File path, data reader, grid, lazy grid or mosaic.
+        func: Function applied to each tile (including the buffer).
+        output: Output file path.  Defaults to None (returns a grid).
+        tile_size: Tile width and height in cells.  Defaults to 256.
+        buffer: Number of overlapping cells read around each tile.  Defaults to 0.
+        max_workers: Number of workers.  Defaults to 1.
+        index: Band index.  Defaults to 1.
+        dtype: Output data type.  Defaults to the type of the first tile.
+        driver: Output driver.  Defaults to the one implied by the file extension.
+        executor: "thread" or "process" (POSIX only).  Defaults to "thread".
+        verbose: Whether to print progress for serial processing.  Defaults to True.
+
+    Returns:
+        Optional[Grid]: A new grid or None if written to a file.
+    """
+    from glidergun._grid import Grid
+    from glidergun._lazy import LazyGrid
+    from glidergun._mosaic import Mosaic
+
+    if isinstance(source, str):
+        with rasterio.open(source) as dataset:
+            return process_tiles(
+                dataset,
+                func,
+                output,
+                tile_size,
+                buffer,
+                max_workers,
+                index,
+                dtype,
+                driver,
+                executor,
+                verbose,
+            )
+
+    if isinstance(source, Grid):
+        reader = _GridReader(source)
+    elif isinstance(source, LazyGrid):
+        reader = _LazyReader(source)
+    elif isinstance(source, Mosaic):
+        reader = _MosaicReader(source, index)
+    else:
+        reader = _DatasetReader(source, index)
+
+    if output is None:
+        writer = _ArrayWriter(reader)
+        try:
+            _execute(
+                reader, writer, func, tile_size, buffer, max_workers, executor, verbose
+            )
+            g = writer.result()
+        finally:
+            writer.close()
+        return g if dtype is None else g.type(dtype)
+
+    file_writer = _FileWriter(reader, output, dtype, driver)
+    try:
+        _execute(
+            reader,
+            file_writer,
+            func,
+            tile_size,
+            buffer,
+            max_workers,
+            executor,
+            verbose,
+        )
+    finally:
+        file_writer.close()
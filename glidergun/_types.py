@@ -18,6 +18,7 @@ class GridCore:
 class Defaults:
     display: Union[ColorMap, Any] = "gray"
     annotation_threshold: int = 12
+    block_size: int = 1048576
 
 
 class Extent(NamedTuple):
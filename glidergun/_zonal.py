@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Any, Callable, Union, cast
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple, Tuple, Union, cast
 
 import numpy as np
 from numpy import ndarray
@@ -8,42 +8,186 @@ if TYPE_CHECKING:
     from glidergun._grid import Grid
 
 
+@dataclass(frozen=True, eq=False)
+class ZonalStatistics:
+    zone: ndarray
+    count: ndarray
+    sum: ndarray
+    mean: ndarray
+    min: ndarray
+    max: ndarray
+    var: ndarray
+    std: ndarray
+    median: ndarray
+
+
+class _Zones(NamedTuple):
+    grid: "Grid"
+    mask: ndarray
+    zones: ndarray
+    inverse: ndarray
+    values: ndarray
+    valid: ndarray
+
+    def labelled(self) -> Tuple[ndarray, ndarray, int]:
+        return self.inverse[self.valid], self.values[self.valid], len(self.zones)
+
+    def broadcast(self, statistics: ndarray) -> "Grid":
+        if self.mask.all():
+            return self.grid.local(statistics[self.inverse].reshape(self.mask.shape))
+        data = np.full(self.mask.shape, np.nan)
+        data[self.mask] = statistics[self.inverse]
+        return self.grid.local(data)
+
+
 @dataclass(frozen=True)
 class Zonal:
     def zonal(self, func: Callable[[ndarray], Any], zone_grid: "Grid") -> "Grid":
-        g = cast("Grid", self)
-        zone_grid = zone_grid.type("int32")
-        result = self
-        for zone in set(zone_grid.data[np.isfinite(zone_grid.data)]):
-            zone_value = int(zone + 0.5)
-            data = g.set_nan(zone_grid != zone_value).data
-            statistics = func(data[np.isfinite(data)])
-            result = (zone_grid == zone_value).then(statistics, result)  # type: ignore
-        return cast("Grid", result)
+        z = self._zones(zone_grid)
+        labels = z.inverse[z.valid]
+        order = np.argsort(labels, kind="stable")
+        count = np.bincount(labels, minlength=len(z.zones))
+        groups = np.split(z.values[z.valid][order], np.cumsum(count)[:-1])
+        return z.broadcast(np.array([func(a) for a in groups]))
+
+    def zonal_statistics(self, zone_grid: "Grid") -> ZonalStatistics:
+        """Computes statistics of the cells of this grid for every zone.
+
+        Zones are the integer values of ``zone_grid``; NaN and infinite cells are
+        ignored.  Statistics are accumulated in float64 and the variance is the
+        population variance (``ddof=0``).
+
+        Note:
+            This differs from releases before the single-pass engine, which
+            accumulated in the grid's data type and kept the values of cells
+            whose zone is NaN.  Such cells are now NaN in every ``zonal_*``
+            result, and float32 statistics may differ in the last digit.
+
+        Args:
+            zone_grid: Zone grid.
+
+        Returns:
+            ZonalStatistics: One array per statistic, aligned with ``zone``.
+        """
+        z = self._zones(zone_grid)
+        labels, values, n = z.labelled()
+        count, total, mean, var = _moments(labels, values, n)
+        return ZonalStatistics(
+            z.zones,
+            count,
+            total,
+            mean,
+            _extreme(labels, values, n, np.minimum),
+            _extreme(labels, values, n, np.maximum),
+            var,
+            np.sqrt(var),
+            _median(labels, values, count),
+        )
+
+    def _zones(self, zone_grid: "Grid") -> _Zones:
+        g, zone_grid = cast("Grid", self).standardize(zone_grid)
+        mask = np.isfinite(zone_grid.data)
+        zones, inverse = np.unique(
+            zone_grid.data[mask].astype("int32"), return_inverse=True
+        )
+        values = np.asarray(g.data[mask], dtype="float64")
+        return _Zones(g, mask, zones, inverse, values, np.isfinite(values))
+
+    def _zonal_statistic(self, name: str, zone_grid: "Grid") -> "Grid":
+        z = self._zones(zone_grid)
+        labels, values, n = z.labelled()
+        if name == "median":
+            statistic = _median(labels, values, np.bincount(labels, minlength=n))
+        elif name in ("min", "max"):
+            func = np.minimum if name == "min" else np.maximum
+            statistic = _extreme(labels, values, n, func)
+        else:
+            _, total, mean, var = _moments(labels, values, n)
+            statistics = {"sum": total, "mean": mean, "var": var, "std": np.sqrt(var)}
+            statistic = statistics[name]
+        return z.broadcast(statistic)
 
     def zonal_count(self, value: Union[float, int], zone_grid: "Grid", **kwargs):
-        return self.zonal(lambda a: np.count_nonzero(a == value, **kwargs), zone_grid)
+        if kwargs:
+            return self.zonal(
+                lambda a: np.count_nonzero(a == value, **kwargs), zone_grid
+            )
+        z = self._zones(zone_grid)
+        count = np.bincount(
+            z.inverse[z.valid], z.values[z.valid] == value, minlength=len(z.zones)
+        )
+        return z.broadcast(count.astype("int64"))
 
     def zonal_ptp(self, zone_grid: "Grid", **kwargs):
-        return self.zonal(lambda a: np.ptp(a, **kwargs), zone_grid)
+        if kwargs:
+            return self.zonal(lambda a: np.ptp(a, **kwargs), zone_grid)
+        z = self._zones(zone_grid)
+        labels, values, n = z.labelled()
+        maximum = _extreme(labels, values, n, np.maximum)
+        return z.broadcast(maximum - _extreme(labels, values, n, np.minimum))
 
     def zonal_median(self, zone_grid: "Grid", **kwargs):
-        return self.zonal(lambda a: np.median(a, **kwargs), zone_grid)
+        if kwargs:
+            return self.zonal(lambda a: np.median(a, **kwargs), zone_grid)
+        return self._zonal_statistic("median", zone_grid)
 
     def zonal_mean(self, zone_grid: "Grid", **kwargs):
-        return self.zonal(lambda a: np.mean(a, **kwargs), zone_grid)
+        if kwargs:
+            return self.zonal(lambda a: np.mean(a, **kwargs), zone_grid)
+        return self._zonal_statistic("mean", zone_grid)
 
     def zonal_std(self, zone_grid: "Grid", **kwargs):
-        return self.zonal(lambda a: np.std(a, **kwargs), zone_grid)
+        if kwargs:
+            return self.zonal(lambda a: np.std(a, **kwargs), zone_grid)
+        return self._zonal_statistic("std", zone_grid)
 
     def zonal_var(self, zone_grid: "Grid", **kwargs):
-        return self.zonal(lambda a: np.var(a, **kwargs), zone_grid)
+        if kwargs:
+            return self.zonal(lambda a: np.var(a, **kwargs), zone_grid)
+        return self._zonal_statistic("var", zone_grid)
 
     def zonal_min(self, zone_grid: "Grid", **kwargs):
-        return self.zonal(lambda a: np.min(a, **kwargs), zone_grid)
+        if kwargs:
+            return self.zonal(lambda a: np.min(a, **kwargs), zone_grid)
+        return self._zonal_statistic("min", zone_grid)
 
     def zonal_max(self, zone_grid: "Grid", **kwargs):
-        return self.zonal(lambda a: np.max(a, **kwargs), zone_grid)
+        if kwargs:
+            return self.zonal(lambda a: np.max(a, **kwargs), zone_grid)
+        return self._zonal_statistic("max", zone_grid)
 
     def zonal_sum(self, zone_grid: "Grid", **kwargs):
-        return self.zonal(lambda a: np.sum(a, **kwargs), zone_grid)
+        if kwargs:
+            return self.zonal(lambda a: np.sum(a, **kwargs), zone_grid)
+        return self._zonal_statistic("sum", zone_grid)
+
+
+def _moments(
+    labels: ndarray, values: ndarray, n: int
+) -> Tuple[ndarray, ndarray, ndarray, ndarray]:
+    count = np.bincount(labels, minlength=n)
+    total = np.bincount(labels, values, minlength=n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        deviations = (values - mean[labels]) ** 2
+        var = np.bincount(labels, deviations, minlength=n) / count
+    return count, total, mean, var
+
+
+def _extreme(labels: ndarray, values: ndarray, n: int, func: np.ufunc) -> ndarray:
+    result = np.full(n, np.inf if func is np.minimum else -np.inf)
+    func.at(result, labels, values)
+    result[np.bincount(labels, minlength=n) == 0] = np.nan
+    return result
+
+
+def _median(labels: ndarray, values: ndarray, count: ndarray) -> ndarray:
+    order = np.lexsort((values, labels))
+    sorted_values = np.append(values[order], np.nan)
+    start = np.cumsum(count) - count
+    empty = count == 0
+    start[empty] = len(values)
+    middle = (
+        sorted_values[start + (count - 1) // 2] + sorted_values[start + count // 2]
+    ) / 2
+    return np.where(empty, np.nan, middle)
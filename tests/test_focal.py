@@ -4,6 +4,7 @@ import numpy as np
 import pytest
 
 from glidergun._grid import Grid, grid
+from glidergun._literals import ConvolutionBackend
 
 
 class TestFocal:
@@ -139,3 +140,139 @@ class TestFocal:
     def test_compare_focal_ptp(self, sample_grid: Grid):
         g1, g2 = self.get_focal_grids(sample_grid, Grid.focal_ptp)
         assert g1.md5 == g2.md5
+
+    @pytest.mark.parametrize("name", ["sum", "mean", "std", "var"])
+    @pytest.mark.parametrize("ignore_nan", [True, False])
+    def test_summed_area_matches_sliding_window(self, name: str, ignore_nan: bool):
+        data = np.random.default_rng(0).normal(100, 20, (60, 50))
+        data[data < 90] = np.nan
+        g = grid(data)
+        f = getattr(np, f"nan{name}" if ignore_nan else name)
+        expected = g.focal(lambda a: f(a, axis=2), 3, False, 1)
+        result = getattr(g, f"focal_{name}")(3, ignore_nan=ignore_nan)
+        np.testing.assert_allclose(result.data, expected.data, rtol=1e-5, atol=1e-5)
+
+    def test_summed_area_focal_count(self):
+        g = grid(np.random.default_rng(0).integers(0, 3, (60, 50)))
+        expected = g.focal(lambda a: np.count_nonzero(a == 1, axis=2), 4, False, 1)
+        result = g.focal_count(1, 4)
+        np.testing.assert_array_equal(result.data, expected.data)
+
+    @pytest.mark.parametrize("name", ["min", "max", "median"])
+    @pytest.mark.parametrize("ignore_nan", [True, False])
+    def test_native_engines_match_sliding_window(self, name: str, ignore_nan: bool):
+        rng = np.random.default_rng(0)
+        data = rng.integers(0, 12, (60, 50)).astype("float64")
+        data[rng.random(data.shape) < 0.2] = np.nan
+        g = grid(data)
+        f = getattr(np, f"nan{name}" if ignore_nan else name)
+        for buffer in (1, 4):
+            expected = g.focal(lambda a: f(a, axis=2), buffer, False, 1)
+            result = getattr(g, f"focal_{name}")(buffer, ignore_nan=ignore_nan)
+            np.testing.assert_array_equal(result.data, expected.data)
+
+    def test_native_focal_ptp(self):
+        g = grid(np.random.default_rng(0).normal(0, 1, (60, 50)))
+        expected = g.focal(lambda a: np.ptp(a, axis=2), 3, False, 1)
+        np.testing.assert_array_equal(g.focal_ptp(3).data, expected.data)
+
+    @pytest.mark.parametrize("backend", ["auto", "direct", "fft", "separable"])
+    def test_convolve_matches_focal_mean(self, backend: ConvolutionBackend):
+        rng = np.random.default_rng(0)
+        data = rng.normal(0, 1, (80, 70))
+        data[rng.random(data.shape) < 0.1] = np.nan
+        g = grid(data)
+        kernel = np.ones((7, 7)) / 49
+        result = g.convolve(kernel, backend=backend)
+        np.testing.assert_allclose(result.data, g.focal_mean(3).data, atol=1e-5)
+        result = g.convolve(kernel, "propagate", backend)
+        expected = g.focal_mean(3, ignore_nan=False)
+        np.testing.assert_allclose(result.data, expected.data, atol=1e-5)
+
+    def test_convolve_backends_agree(self):
+        g = grid(np.random.default_rng(0).normal(0, 1, (80, 70)))
+        x = np.exp(-(np.arange(-6, 7) ** 2) / 8)
+        kernel = np.outer(x, x)
+        expected = g.convolve(kernel, "zero", "direct")
+        for backend in ("fft", "separable"):
+            result = g.convolve(kernel, "zero", backend)
+            np.testing.assert_allclose(result.data, expected.data, atol=1e-4)
+        tiled = g.convolve(kernel, max_workers=3)
+        np.testing.assert_allclose(tiled.data, g.convolve(kernel).data, atol=1e-5)
+
+    def test_convolve_invalid_kernel(self):
+        g = grid(np.ones((10, 10)))
+        with pytest.raises(ValueError):
+            g.convolve(np.ones((2, 3)))
+        with pytest.raises(ValueError):
+            g.convolve(np.eye(3), backend="separable")
+
+    @pytest.mark.parametrize(
+        "name",
+        ["focal_mean", "focal_std", "focal_sum", "focal_min", "focal_max", "focal_ptp"],
+    )
+    def test_focal_fast_paths_tiled(self, name: str, monkeypatch):
+        tile_sizes = []
+        process_tiles = Grid.process_tiles
+
+        def spy(self, func, tile_size, *args):
+            tile_sizes.append(tile_size)
+            return process_tiles(self, func, tile_size, *args)
+
+        monkeypatch.setattr(Grid, "process_tiles", spy)
+        rng = np.random.default_rng(0)
+        data = rng.normal(0, 1, (60, 50))
+        data[rng.random(data.shape) < 0.1] = np.nan
+        g = grid(data)
+        expected = getattr(g, name)(3)
+        result = getattr(g, name)(3, max_workers=3)
+        np.testing.assert_allclose(result.data, expected.data, atol=1e-6)
+        assert tile_sizes[-1] == 20
+        q = grid(rng.integers(0, 5, (60, 50)))
+        tiled = q.focal_count(1, 2, max_workers=3)
+        np.testing.assert_array_equal(tiled.data, q.focal_count(1, 2).data)
+        tiled = q.focal_median(2, max_workers=3)
+        np.testing.assert_array_equal(tiled.data, q.focal_median(2).data)
+
+    @pytest.mark.parametrize("ignore_nan", [True, False])
+    def test_focal_generic_vectorized(self, ignore_nan: bool):
+        rng = np.random.default_rng(0)
+        data = rng.normal(0, 1, (60, 50))
+        data[rng.random(data.shape) < 0.1] = np.nan
+        g = grid(data)
+        f = np.nanmax if ignore_nan else np.max
+        expected = g.focal_generic(f, 2, ignore_nan=ignore_nan)
+        result = g.focal_generic(np.maximum, 2, ignore_nan=ignore_nan)
+        np.testing.assert_array_equal(result.data, expected.data)
+        result = g.focal_generic(
+            lambda a: f(a, axis=2), 2, ignore_nan=ignore_nan, vectorized=True
+        )
+        np.testing.assert_array_equal(result.data, expected.data)
+
+    def test_focal_generic_chunked(self):
+        g = grid(np.random.default_rng(0).normal(0, 1, (60, 50)))
+        expected = g.focal_generic(lambda v: np.percentile(v, 90), 2, True)
+        result = g.focal_generic(
+            lambda a: np.nanpercentile(a, 90, axis=2),
+            2,
+            True,
+            vectorized=True,
+            chunk_size=7,
+        )
+        np.testing.assert_allclose(result.data, expected.data, atol=1e-6)
+
+    @pytest.mark.parametrize("func", [max, np.max, np.nanmax, np.maximum])
+    def test_focal_generic_nan_hole(self, func):
+        data = np.arange(400, dtype="float64").reshape(20, 20)
+        data[5:15, 5:15] = np.nan
+        result = grid(data).focal_generic(func, 2)
+        assert np.isnan(result.data[8:12, 8:12]).all()
+        assert result.data[6, 6] == data[8, 4]
+        assert np.isfinite(result.data[:3]).all()
+
+    def test_focal_generic_invalid_ufunc(self):
+        g = grid(np.ones((10, 10)))
+        with pytest.raises(ValueError):
+            g.focal_generic(np.sqrt)
+        with pytest.raises(ValueError):
+            g.focal_generic(np.subtract)
@@ -1,3 +1,7 @@
+import numpy as np
+import pytest
+
+from glidergun._display import animate
 from glidergun._grid import Grid, grid
 
 
@@ -22,3 +26,53 @@ def test_glidergun15():
         md5s.add(gosper.md5)
         gosper = tick(gosper)
     assert len(md5s) == 30
+
+
+def test_automaton_matches_tick():
+    g = grid(".data/glidergun30.asc")
+    automaton = g.automaton("B3/S23")
+    for _ in range(100):
+        g = tick(g)
+        assert automaton.step().grid.md5 == g.md5
+    assert automaton.generation == 100
+
+
+def test_automaton_period():
+    frames = grid(".data/glidergun15.asc").simulate(120)
+    md5s = [f.md5 for f in frames]
+    assert len(set(md5s[1:])) == 30
+
+
+def test_automaton_wrap():
+    for width in (50, 64, 70):
+        data = np.zeros((width, width))
+        data[[0, 1, 2, 2, 2], [1, 2, 0, 1, 2]] = 1
+        g = grid(data) == 1
+        automaton = g.automaton(wrap=True).step(4 * width)
+        assert automaton.grid.md5 == g.md5
+        assert automaton.population == 5
+
+
+def test_automaton_invalid_rule():
+    with pytest.raises(ValueError):
+        grid((10, 10)).automaton("B9/S23")
+
+
+def test_animate_to_file(tmp_path):
+    from PIL import Image
+
+    file = str(tmp_path / "life.gif")
+    seed = grid(".data/glidergun15.asc")
+    assert animate(seed.simulate(), every=2, frames=10, file=file) is None
+    with Image.open(file) as image:
+        assert image.n_frames == 10  # type: ignore
+
+
+def test_animate_generator_to_file(tmp_path):
+    from PIL import Image
+
+    file = str(tmp_path / "life.gif")
+    seed = grid(np.random.default_rng(0).random((40, 60)) > 0.6)
+    animate((-g for g in seed.simulate(generations=150)), file=file)
+    with Image.open(file) as image:
+        assert image.n_frames == 151  # type: ignore
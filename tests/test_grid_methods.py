@@ -1,6 +1,9 @@
 import numpy as np
+import pytest
+from scipy.interpolate import RBFInterpolator
 
-from glidergun._grid import grid
+from glidergun._grid import distance, grid, idw
+from glidergun._interpolation import interpolate_tiles
 
 
 def test_grid_reclass():
@@ -110,6 +113,43 @@ def test_grid_interp_compare():
     assert g3.min != g3.max
 
 
+def test_idw_nearest_neighbors():
+    points = [(1, 1, 10), (4, 7, 40), (8, 2, 7), (9, 9, 3)]
+    extent = (0, 0, 10, 10)
+    g1 = idw(points, extent, 4326, 1)
+    g2 = idw(points, extent, 4326, 1, k=len(points))
+    g3 = idw(points, extent, 4326, 1, k=1)
+    x, y = g3._coords("float64").T
+    d = np.hypot(x[:, None] - [1, 4, 8, 9], y[:, None] - [1, 7, 2, 9])
+    assert np.allclose(g1.data, g2.data)
+    assert np.array_equal(g3.data.ravel(), np.array([10, 40, 7, 3])[d.argmin(1)])
+
+
+def test_idw_radius_and_power():
+    rng = np.random.default_rng(0)
+    points = np.column_stack([rng.uniform(0, 10, (50, 2)), rng.normal(0, 1, 50)])
+    g = idw(points, (0, 0, 10, 10), 4326, 0.5, 2, power=3)
+    x, y = g._coords("float64").T
+    d = np.hypot(x[:, None] - points[:, 0], y[:, None] - points[:, 1])
+    w = np.where(d <= 2, 1 / d**3, 0)
+    with np.errstate(invalid="ignore"):
+        expected = (w @ points[:, 2]) / w.sum(axis=1)
+    assert np.allclose(g.data.ravel(), expected, equal_nan=True, atol=1e-5)
+    assert np.array_equal(
+        g.is_nan().data, idw(points, g.extent, 4326, 0.5, 2, k=5).is_nan().data
+    )
+
+
+def test_distance_to_points():
+    points = [(1.2, 3.4), (7.5, 2.5), (5, 9)]
+    g = distance(points, (0, 0, 10, 10), 4326, 0.5)
+    x, y = g._coords("float64").T
+    expected = np.min(
+        np.hypot(x[:, None] - [1.2, 7.5, 5], y[:, None] - [3.4, 2.5, 9]), 1
+    )
+    assert np.allclose(g.data.ravel(), expected)
+
+
 def test_slope():
     g = grid(
         np.array(
@@ -125,3 +165,168 @@ def test_slope():
 
     assert g.slope().min == 0
     assert g.slope(True).min == 0
+
+
+def test_terrain_uses_cell_size():
+    rows, cols = np.mgrid[0:50, 0:60]
+    g = grid(20.0 * cols - 30.0 * rows, (0, 0, 600, 500), 3857)
+    assert g.cell_size == (10, 10)
+    inner = (slice(1, -1), slice(1, -1))
+    assert np.allclose(g.slope().data[inner], np.degrees(np.arctan(np.sqrt(13))))
+    assert np.allclose(g.slope(True).data[inner], np.arctan(np.sqrt(13)))
+    assert np.allclose(g.curvature().data[inner], 0, atol=1e-3)
+    assert g.hillshade().dtype == "float32"
+
+
+def test_terrain_tiles():
+    data = np.random.default_rng(0).normal(0, 1, (120, 90)).cumsum(0).cumsum(1)
+    g = grid(data, (8, 55, 9, 56), 4326)
+    for name in ["slope", "aspect", "hillshade", "curvature"]:
+        g1 = getattr(g, name)()
+        g2 = getattr(g, name)(max_workers=3)
+        assert np.allclose(g1.data, g2.data)
+
+
+def test_distance_transform():
+    rng = np.random.default_rng(0)
+    data = np.where(rng.random((60, 45)) > 0.98, rng.integers(1, 9, (60, 45)), np.nan)
+    g = grid(data, (0, 0, 9, 24))
+    points = [(p.x, p.y) for p in g.to_points()]
+    assert g.cell_size == (0.2, 0.4)
+    assert np.allclose(g.distance().data, g.distance(points).data)
+
+
+def test_distance_allocation():
+    g = grid(np.array([[1, np.nan, np.nan, np.nan], [np.nan] * 3 + [2]]), (0, 0, 4, 2))
+    d, a = g.distance(allocation=True)
+    assert np.allclose(d.data, [[0, 1, np.sqrt(2), 1], [1, np.sqrt(2), 1, 0]])
+    assert np.array_equal(a.data, [[1, 1, 2, 2], [1, 1, 2, 2]])
+    d, a = g.distance(max_distance=1.2, allocation=True)
+    assert np.array_equal(d.is_nan().data, [[0, 0, 1, 0], [0, 1, 0, 0]])
+    assert np.array_equal(a.is_nan().data, d.is_nan().data)
+
+
+def test_to_arrays():
+    g = grid(np.array([[1, np.nan, 2], [3, 4, np.nan]]), (0, 0, 3, 2))
+    x, y, v = g.to_arrays()
+    assert np.array_equal(x, [0.5, 2.5, 0.5, 1.5])
+    assert np.array_equal(y, [1.5, 1.5, 0.5, 0.5])
+    assert np.array_equal(v, [1, 2, 3, 4])
+    assert [tuple(p) for p in zip(x, y, v)] == g.to_points()
+    chunks = list(g.to_arrays(True, 3, "float32"))
+    assert len(chunks) == 2
+    assert all(a.dtype == "float32" for chunk in chunks for a in chunk)
+    assert np.array_equal(
+        np.concatenate([c[2] for c in chunks]), g.data.ravel(), equal_nan=True
+    )
+    _, _, v = grid(np.array([[np.inf, np.nan, -np.inf]])).to_arrays()
+    assert np.array_equal(v, [np.inf, -np.inf])
+
+
+def test_hillshade_many():
+    data = np.random.default_rng(0).normal(0, 1, (60, 50)).cumsum(0).cumsum(1)
+    g = grid(data, (8, 55, 9, 56), 4326)
+    s = g.hillshade_many([270, 315, 360], [30, 45, 60])
+    assert len(s.grids) == 3
+    assert np.allclose(s.grids[1].data, g.hillshade().data, atol=1e-3)
+    assert np.allclose(s.grids[2].data, g.hillshade(360, 60).data, atol=1e-3)
+    assert len(g.hillshade_many([0, 90, 180, 270]).grids) == 4
+
+
+def test_thumbnail():
+    from io import BytesIO
+
+    from PIL import Image
+
+    data = np.random.default_rng(0).normal(0, 1, (2000, 3000))
+    data[:100] = np.nan
+    image = np.asarray(Image.open(BytesIO(grid(data).color("viridis")._thumbnail())))
+    assert image.shape == (400, 600, 4)
+    assert (image[:20, :, 3] == 0).all() and (image[21:, :, 3] == 255).all()
+    image = np.asarray(Image.open(BytesIO(grid(np.eye(4))._thumbnail())))
+    assert image.shape == (480, 480, 4)
+    assert (image[:120, :120, :3] == 255).all() and (image[:120, 120:, :3] == 0).all()
+
+
+def test_interpolate_tiles():
+    rng = np.random.default_rng(0)
+    points = np.column_stack([rng.random((50, 2)) * 100, rng.normal(0, 1, 50)])
+    g = grid(np.nan, (0, 0, 100, 100), 4326, 0.2)
+    for name in ("interp_linear", "interp_nearest", "interp_clough_tocher"):
+        g1 = getattr(g, name)(points)
+        g2 = getattr(g, name)(points, max_workers=3)
+        assert g1.dtype == "float32"
+        assert g1.md5 == g2.md5
+
+
+def test_interp_rbf_tiles():
+    rng = np.random.default_rng(0)
+    xy = rng.random((1000, 2)) * 100
+    points = np.column_stack([xy, np.sin(xy[:, 0] / 10) * np.cos(xy[:, 1] / 15)])
+    g = grid(np.nan, (0, 0, 100, 100), 4326, 1)
+    g1 = g.interp_rbf(points)
+    g2 = g.interp_rbf(points, tile_size=25, max_workers=2)
+    assert g2.dtype == "float32"
+    assert np.abs(g1.data - g2.data).max() < 0.01
+
+
+def test_interp_kriging():
+    rng = np.random.default_rng(0)
+    xy = rng.random((500, 2)) * 100
+    z = np.sin(xy[:, 0] / 10) * np.cos(xy[:, 1] / 15)
+    g = grid(np.nan, (0, 0, 100, 100), 4326, 1)
+    x, y = np.meshgrid(np.linspace(0, 100, 100), np.linspace(100, 0, 100))
+    expected = np.sin(x / 10) * np.cos(y / 15)
+    for universal in (False, True):
+        result, variance = g.interp_kriging(
+            np.column_stack([xy, z]), universal=universal, variance=True
+        )
+        assert result.dtype == "float32"
+        assert np.abs(result.data - expected).mean() < 0.02
+        assert variance.min >= 0
+        assert variance.value_at(*xy[0]) < variance.max
+
+
+def test_interp_kriging_exact():
+    cells = [(0, 0, 10), (5, 7, 40), (8, 2, 7), (3, 3, 3)]
+    points = [(c * 10 / 9, 10 - r * 10 / 9, value) for r, c, value in cells]
+    g = grid(np.nan, (0, 0, 10, 10), 4326, 1).interp_kriging(points, model="linear")
+    for r, c, value in cells:
+        assert abs(g.data[r, c] - value) < 1e-3
+
+
+def test_interp_rbf_max_points():
+    rng = np.random.default_rng(0)
+    xy = rng.random((20000, 2)) * 100
+    points = np.column_stack([xy, np.sin(xy[:, 0] / 10) * np.cos(xy[:, 1] / 15)])
+    sizes = []
+
+    def f(coords, values):
+        sizes.append(len(coords))
+        return RBFInterpolator(coords, values)
+
+    g = interpolate_tiles(f, points, (0, 0, 100, 100), 4326, 1, 25, max_points=300)
+    x, y = np.meshgrid(np.linspace(0, 100, 100), np.linspace(100, 0, 100))
+    error = np.abs(g.data - np.sin(x / 10) * np.cos(y / 15))
+    assert max(sizes) == 300
+    assert error.mean() < 0.005 and error[5:-5, 5:-5].max() < 0.01
+    g2 = interpolate_tiles(f, points, (0, 0, 100, 100), 4326, 1, 25, max_points=300)
+    g3 = interpolate_tiles(
+        f, points, (0, 0, 100, 100), 4326, 1, 25, max_points=300, seed=1
+    )
+    assert g2.md5 == g.md5 and g3.md5 != g.md5
+
+
+def test_density_binned():
+    rng = np.random.default_rng(0)
+    points = rng.normal(50, 10, (500, 2))
+    weights = rng.random(500)
+    g = grid(np.nan, (0, 0, 100, 100), 3857, 1)
+    for kernel in ("gaussian", "epanechnikov"):
+        g1 = g.density(points, bandwidth=8, kernel=kernel, weights=weights)
+        g2 = g.density(points, bandwidth=8, kernel=kernel, weights=weights, binned=True)
+        assert np.abs(g1.data - g2.data).max() < 0.01 * g1.max
+    g3 = g.density(points, bandwidth=8, kernel="quartic", binned=True)
+    assert abs(g3.data.sum() - 1) < 0.01
+    with pytest.raises(ValueError):
+        g.density(points, kernel="quartic")
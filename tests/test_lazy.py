@@ -0,0 +1,137 @@
+import numpy as np
+
+from glidergun._grid import grid
+from glidergun._lazy import FileSource, LazyGrid
+from glidergun._types import Defaults
+
+g1 = grid(np.arange(12000).reshape(120, 100), (0, 0, 100, 120))
+g2 = grid(np.arange(12000).reshape(120, 100) % 7 + 1.5, (0, 0, 100, 120))
+
+
+def test_lazy_operators_return_lazy_grid():
+    assert isinstance(g1.lazy() + g2, LazyGrid)
+    assert isinstance(g1 + g2.lazy(), LazyGrid)
+    assert isinstance(2 * g1.lazy(), LazyGrid)
+    assert isinstance(g1.lazy() < 3, LazyGrid)
+
+
+def test_grid_operators_defer_to_lazy_grid():
+    b = g2.lazy()
+    assert (g1 - b).compute().md5 == (g1 - g2).md5
+    assert (g1 / b).compute().md5 == (g1 / g2).md5
+    assert (g1 < b).compute().md5 == (g1 < g2).md5
+    assert (g1 >= b).compute().md5 == (g1 >= g2).md5
+    shift = grid(np.full((120, 100), 2), (0, 0, 100, 120))
+    assert (g1 >> shift.lazy()).compute().md5 == (g1 >> shift).md5
+
+
+def test_lazy_matches_eager():
+    a, b = g1.lazy(), g2.lazy()
+    lazy = (a - b) / (a + b)
+    eager = (g1 - g2) / (g1 + g2)
+    assert lazy.compute().md5 == eager.md5
+    assert lazy.compute().dtype == eager.dtype
+    assert lazy.extent == eager.extent
+
+
+def test_lazy_matches_eager_in_blocks():
+    block_size = Defaults.block_size
+    Defaults.block_size = 250
+    try:
+        lazy = ((g1.lazy() % 13 > 5).then(g2, -g1) ** 2).log(10)
+        eager = ((g1 % 13 > 5).then(g2, -g1) ** 2).log(10)
+        assert lazy.compute().md5 == eager.md5
+    finally:
+        Defaults.block_size = block_size
+
+
+def test_lazy_comparison():
+    lazy = (g1.lazy() > 100) & (g2.lazy() != 2.5)
+    eager = (g1 > 100) & (g2 != 2.5)
+    assert lazy.compute().dtype == "bool"
+    assert np.array_equal(lazy.data, eager.data)
+
+
+def test_lazy_aligns_grids():
+    g3 = grid(np.ones((60, 50)), (50, 60, 100, 120))
+    lazy = g1.lazy() * g3
+    eager = g1.clip(*g3.extent) * g3
+    assert lazy.extent == eager.extent
+    assert lazy.compute().md5 == eager.md5
+
+
+def test_lazy_does_not_evaluate_until_needed():
+    calls = []
+
+    def f(a):
+        calls.append(len(a))
+        return a + 1
+
+    lazy = g1.lazy().local(f) * 2
+    assert lazy.width == 100 and lazy.height == 120
+    assert not calls
+    lazy.compute()
+    lazy.compute()
+    assert sum(calls) == 120
+
+
+def test_lazy_reads_each_leaf_once_per_block(tmp_path, monkeypatch):
+    file4, file5 = str(tmp_path / "b4.tif"), str(tmp_path / "b5.tif")
+    g1.save(file4)
+    g2.save(file5)
+    b4, b5 = grid(file4, lazy=True), grid(file5, lazy=True)
+    calls = []
+    read = FileSource.read
+
+    def f(self, rows, cols):
+        calls.append(self.file)
+        return read(self, rows, cols)
+
+    monkeypatch.setattr(FileSource, "read", f)
+    block_size = Defaults.block_size
+    Defaults.block_size = 3000
+    try:
+        lazy = (b5 - b4) / (b5 + b4)
+        assert lazy.compute().md5 == ((g2 - g1) / (g2 + g1)).md5
+    finally:
+        Defaults.block_size = block_size
+    assert calls.count(file4) == calls.count(file5) == 4
+
+
+def test_lazy_aligns_files_without_reading(tmp_path, monkeypatch):
+    file1, file2 = str(tmp_path / "a.tif"), str(tmp_path / "b.tif")
+    g1.save(file1)
+    g3 = grid(np.arange(3000).reshape(60, 50) % 11, (30.5, 40, 80.5, 100))
+    g3.save(file2)
+    calls = []
+    read = FileSource.read
+
+    def f(self, rows, cols):
+        calls.append(self.file)
+        return read(self, rows, cols)
+
+    monkeypatch.setattr(FileSource, "read", f)
+    lazy = grid(file1, lazy=True) + grid(file2, lazy=True)
+    assert not calls
+    eager = g1.clip(*g3.extent) + g3
+    assert lazy.extent == eager.extent
+    assert lazy.compute().md5 == eager.md5
+    assert calls
+
+
+def test_lazy_file(tmp_path):
+    file = str(tmp_path / "input.tif")
+    g = (g2 > 3).then(g1, np.nan)
+    g.save(file)
+    lazy = grid(file, lazy=True)
+    assert isinstance(lazy, LazyGrid)
+    assert lazy.extent == g.extent
+    assert lazy.compute().md5 == g.md5
+    assert lazy.clip(12.3, 45.6, 78.9, 101.2).md5 == g.clip(12.3, 45.6, 78.9, 101.2).md5
+    assert lazy.value_at(10.5, 3.5) == g.value_at(10.5, 3.5)
+    assert [t.md5 for t in lazy.tiles(30, 40)] == [t.md5 for t in g.tiles(30, 40)]
+    result = lazy.process_tiles(lambda t: t.focal_mean(), 32, 1)
+    assert result.md5 == g.focal_mean().md5
+    assert ((lazy + g2) * g1.clip(0, 0, 50, 60)).compute().md5 == (
+        (g + g2) * g1.clip(0, 0, 50, 60)
+    ).md5
@@ -1,5 +1,10 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
 from glidergun._grid import Grid, grid
-from glidergun._mosaic import mosaic
+from glidergun._mosaic import Mosaic, mosaic
 
 
 def test_mosaic_function_with_grids():
@@ -7,3 +12,67 @@ def test_mosaic_function_with_grids():
     g2 = grid((50, 40), (0, 0, 4, 3))
     result_grid = mosaic(g1, g2)
     assert isinstance(result_grid, Grid)
+
+
+def create_tiles(folder):
+    g = grid(np.random.default_rng(0).integers(0, 100, (60, 80)), (0, 0, 8, 6))
+    files = []
+    for x in range(0, 8, 2):
+        for y in range(0, 6, 2):
+            files.append(str(folder / f"{x}_{y}.tif"))
+            g.clip(x, y, x + 2, y + 2).save(files[-1])
+    return g, files
+
+
+def test_mosaic_clip_matches_grid(tmp_path):
+    g, files = create_tiles(tmp_path)
+    m = mosaic(*files, max_open=2)
+    for e in [(1, 1, 5, 4), (0.55, 1.23, 7.41, 5.92), (-1, -1, 3, 2.5)]:
+        result = m.clip(*e)
+        assert result
+        assert result.md5 == g.clip(*result.extent).md5
+    assert len(m._pool.datasets) == 2
+    assert m.clip(10, 10, 12, 12) is None
+
+
+def test_mosaic_threads_do_not_share_datasets(tmp_path):
+    g, files = create_tiles(tmp_path)
+    m = mosaic(*files, max_open=4)
+    d1, d2 = m._pool._checkout(files[0]), m._pool._checkout(files[0])
+    assert d1 is not d2
+    m._pool._checkin(files[0], d1)
+    m._pool._checkin(files[0], d2)
+    assert m._pool._checkout(files[0]) is d2
+    m._pool._checkin(files[0], d2)
+    extents = [
+        (x / 4, y / 4, x / 4 + 3, y / 4 + 2) for x in range(20) for y in range(16)
+    ]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda e: m.clip(*e), extents))
+    for e, result in zip(extents, results):
+        assert result and result.md5 == g.clip(*result.extent).md5
+    assert len(m._pool.datasets) <= 4
+
+
+def test_mosaic_index_file(tmp_path):
+    _, files = create_tiles(tmp_path)
+    index_file = str(tmp_path / "index.json")
+    m1 = mosaic(*files, index_file=index_file)
+    with open(index_file) as f:
+        assert set(json.load(f)["files"]) == set(files)
+    m2 = mosaic(*files, index_file=index_file, max_workers=1)
+    assert m2.profiles == m1.profiles
+
+
+def test_mosaic_catalog(tmp_path):
+    g, files = create_tiles(tmp_path)
+    catalog = str(tmp_path / "catalog" / "tiles.json")
+    m1 = mosaic(*files, max_workers=4)
+    m1.save(catalog)
+    m2 = Mosaic.load(catalog)
+    assert m2.profiles == m1.profiles
+    assert m2.extent == m1.extent == g.extent
+    assert m2.profiles[files[0]].dtype == "float32"
+    result = m2.clip(1, 1, 5, 4)
+    assert result
+    assert result.md5 == g.clip(1, 1, 5, 4).md5
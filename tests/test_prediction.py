@@ -0,0 +1,39 @@
+import numpy as np
+from sklearn.linear_model import LinearRegression
+
+from glidergun._grid import grid
+
+rng = np.random.default_rng(0)
+g1 = grid(rng.normal(0, 1, (300, 200)), (0, 0, 200, 300))
+g2 = grid(rng.normal(0, 1, (300, 200)), (0, 0, 200, 300))
+y = g1 * 2 + g2 * 3 + 1
+
+
+def test_predict_skips_masked_cells():
+    model = y.fit(LinearRegression(), g1, g2)
+    g3 = g2.set_nan(g2 > 1.5)
+    result = model.predict(g1, g3, batch_size=1000, max_workers=2, tile_size=64)
+    assert result.extent == y.extent
+    assert np.array_equal(np.isnan(result.data), np.isnan(g3.data))
+    assert np.nanmax(np.abs(result.data - y.data)) < 1e-4
+
+
+def test_predict_from_files(tmp_path):
+    model = y.fit(LinearRegression(), g1, g2)
+    file1, file2 = str(tmp_path / "1.tif"), str(tmp_path / "2.tif")
+    g1.save(file1)
+    g2.save(file2)
+    expected = model.predict(g1, g2)
+    result = model.predict(file1, grid(file2, lazy=True), tile_size=100)
+    assert result.extent == expected.extent
+    np.testing.assert_allclose(result.data, expected.data, atol=1e-4)
+
+
+def test_fit_score_and_predict_skip_the_same_cells(capsys):
+    g3 = g2.set_nan(g2 > 1.5)
+    model = y.fit(LinearRegression(), g1, g3)
+    np.testing.assert_allclose(model.model.coef_, [2, 3], atol=1e-5)
+    assert model.score(y, g1, g3) > 0.9999
+    result = model.predict(g1, g3, tile_size=64)
+    assert np.array_equal(np.isnan(result.data), np.isnan(g3.data))
+    assert "Processing tile" not in capsys.readouterr().out
@@ -0,0 +1,66 @@
+import urllib.error
+import urllib.request
+from io import BytesIO
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from glidergun._grid import grid
+from glidergun._pyramid import TilePyramid
+
+g = grid(np.random.default_rng(0).normal(0, 1, (600, 800)), (-10, 40, 10, 55), 4326)
+
+
+def read(png: bytes):
+    return np.asarray(Image.open(BytesIO(png)))
+
+
+def test_tile():
+    pyramid = TilePyramid(g.color("viridis"))
+    assert pyramid.min_zoom < pyramid.max_zoom
+    assert pyramid.tile(5, 0, 0) is None
+    for x, y in pyramid.tiles(pyramid.max_zoom):
+        image = read(pyramid.tile(pyramid.max_zoom, x, y))  # type: ignore
+        assert image.shape == (256, 256, 4)
+    image = read(pyramid.tile(4, 7, 5))  # type: ignore
+    assert (image[..., 3] == 255).any() and (image[..., 3] == 0).any()
+
+
+def test_tile_cache(tmp_path):
+    pyramid = TilePyramid(g, str(tmp_path))
+    pyramid.save(max_zoom=5)
+    files = list(tmp_path.glob("*/*/*.png"))
+    assert len(files) == sum(len(pyramid.tiles(z)) for z in range(pyramid.min_zoom, 6))
+    file = tmp_path / "5" / "15" / "10.png"
+    assert TilePyramid(g, str(tmp_path)).tile(5, 15, 10) == file.read_bytes()
+
+
+def test_serve():
+    pyramid = TilePyramid(g)
+    try:
+        url = pyramid.serve()
+        png = urllib.request.urlopen(url.format(z=4, x=7, y=5)).read()
+        assert png == pyramid.tile(4, 7, 5)
+        assert read(urllib.request.urlopen(url.format(z=1, x=1, y=1)).read()).max() == 0
+    finally:
+        pyramid.close()
+
+
+def test_cached():
+    grids = [g + i for i in range(1, 5)]
+    try:
+        pyramid = TilePyramid.cached(g)
+        assert TilePyramid.cached(g) is pyramid
+        url = pyramid.serve()
+        first = TilePyramid.cached(grids[0])
+        assert first.serve().split("/")[2] == url.split("/")[2]
+        for o in grids[1:]:
+            TilePyramid.cached(o)
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(url.format(z=4, x=7, y=5))
+        assert TilePyramid.cached(grids[0]) is first
+        del grids[0]
+        assert first._key is None
+    finally:
+        TilePyramid.close_all()
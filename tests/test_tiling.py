@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+import pytest
+
+from glidergun._grid import Grid, grid
+from glidergun._mosaic import mosaic
+from glidergun._tiling import process_tiles, tiles
+
+g = grid(np.random.default_rng(0).normal(0, 1, (300, 200)), (10, 20, 30, 50))
+
+
+def test_tiles():
+    items = tiles(200, 300, 128, 3)
+    assert len(items) == 6
+    assert sum(t.core.width * t.core.height for t in items) == 200 * 300
+    assert items[0].halo.col_off == 0 and items[0].halo.width == 131
+    assert items[-1].halo.col_off == 125 and items[-1].halo.height == 47
+
+
+def test_process_tiles_from_grid():
+    result = process_tiles(g, lambda t: t.focal_mean(3, True), None, 64, 3, 2)
+    assert isinstance(result, Grid)
+    assert result.extent == g.extent
+    assert result.md5 == g.focal_mean(3, True).md5
+
+
+def test_process_tiles_from_file(tmp_path):
+    file = str(tmp_path / "input.tif")
+    g.save(file)
+    result = process_tiles(file, lambda t: t * 2, None, 64)
+    assert result.extent == g.extent
+    assert result.md5 == (g * 2).md5
+
+
+def test_process_tiles_to_file(tmp_path):
+    input_file = str(tmp_path / "input.tif")
+    output_file = str(tmp_path / "output.tif")
+    g.save(input_file)
+    assert process_tiles(input_file, lambda t: t > 0, output_file, 64) is None
+    result = grid(output_file)
+    assert result.extent == g.extent
+    assert np.array_equal(result.data, (g > 0).data)
+
+
+def test_process_tiles_from_mosaic(tmp_path):
+    file1 = str(tmp_path / "1.tif")
+    file2 = str(tmp_path / "2.tif")
+    g.clip(10, 20, 20, 50).save(file1)
+    g.clip(20, 20, 30, 50).save(file2)
+    result = process_tiles(mosaic(file1, file2), lambda t: t + 1, None, 64)
+    assert result.extent == g.extent
+    assert result.md5 == (g + 1).md5
+
+
+def test_process_tiles_cell_size_mismatch():
+    with pytest.raises(ValueError):
+        process_tiles(g, lambda t: t.resample(1), None, 64)
+
+
+def test_process_tiles_with_process_executor(tmp_path):
+    expected = g.focal_mean(2, True)
+    result = g.process_tiles(lambda t: t.focal_mean(2, True), 64, 2, 2, "process")
+    assert result.md5 == expected.md5
+    output_file = str(tmp_path / "output.tif")
+    process_tiles(g, lambda t: t * 2, output_file, 64, 0, 2, executor="process")
+    assert grid(output_file).md5 == (g * 2).md5
+
+
+def test_focal_generic_with_process_executor():
+    g1 = g.clip(10, 20, 15, 30)
+    g2 = g1.focal_generic(np.nanmax, max_workers=3, executor="process")
+    assert g2.md5 == g1.focal_generic(np.nanmax).md5
+
+
+def test_process_executor_releases_shared_memory():
+    def f(t: Grid) -> Grid:
+        if t.xmin > 10:
+            raise RuntimeError()
+        return t * 2
+
+    before = set(os.listdir("/dev/shm"))
+    with pytest.raises(RuntimeError):
+        process_tiles(g, f, None, 64, 0, 2, executor="process")
+    assert set(os.listdir("/dev/shm")) <= before
+
+
+def test_process_executor_rejects_mixed_types():
+    def f(t: Grid) -> Grid:
+        return t.round().type("int32") if t.xmin == 10 else t
+
+    with pytest.raises(TypeError):
+        process_tiles(g, f, None, 64, 0, 2, executor="process")
+    assert process_tiles(g, f, None, 64, 0, 2).dtype == "float32"
+
+
+def test_process_executor_with_promotable_types():
+    def f(t: Grid) -> Grid:
+        return t if t.xmin == 10 else t > 0
+
+    result = process_tiles(g, f, None, 64, 0, 2, executor="process")
+    assert result.dtype == "float32"
+    assert result.md5 == process_tiles(g, f, None, 64, 0, 1, verbose=False).md5
+    assert not np.isnan(result.data).any()
+
+
+def test_interpolation_with_process_executor():
+    points = [(12, 22, 1), (25, 40, 5), (28, 30, 3), (15, 45, 7)]
+    g1 = g.interp_idw(points, max_workers=2, executor="process")
+    assert g1.md5 == g.interp_idw(points).md5
+    g2 = g.interp_linear(points, max_workers=2, executor="process")
+    assert g2.md5 == g.interp_linear(points).md5
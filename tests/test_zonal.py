@@ -61,13 +61,13 @@ def test_zonal_mean(grid_data, zone_grid_data):
 def test_zonal_std(grid_data, zone_grid_data):
     result = grid_data.zonal_std(zone_grid_data)
     g = result.set_nan(zone_grid_data != 1, result)
-    assert g.min == g.max == 1.247219204902649
+    assert g.min == g.max == 1.2472190856933594
 
 
 def test_zonal_var(grid_data, zone_grid_data):
     result = grid_data.zonal_var(zone_grid_data)
     g = result.set_nan(zone_grid_data != 1, result)
-    assert g.min == g.max == 1.5555557012557983
+    assert g.min == g.max == 1.5555555820465088
 
 
 def test_zonal_min(grid_data, zone_grid_data):
@@ -86,3 +86,36 @@ def test_zonal_sum(grid_data, zone_grid_data):
     result = grid_data.zonal_sum(zone_grid_data)
     g = result.set_nan(zone_grid_data != 1, result)
     assert g.min == g.max == 7
+
+
+def test_zonal_statistics(grid_data, zone_grid_data):
+    result = grid_data.zonal_statistics(zone_grid_data)
+    assert result.zone.tolist() == [1, 2, 3]
+    assert result.count.tolist() == [3, 3, 3]
+    assert result.sum.tolist() == [7, 14, 24]
+    assert result.min.tolist() == [1, 3, 7]
+    assert result.max.tolist() == [4, 6, 9]
+    assert result.median.tolist() == [2, 5, 8]
+    np.testing.assert_allclose(result.var, [14 / 9, 14 / 9, 2 / 3])
+
+
+def test_zonal_ignores_nan(grid_data, zone_grid_data):
+    g = grid_data.set_nan(grid_data == 4)
+    zones = zone_grid_data.set_nan(zone_grid_data == 3)
+    result = g.zonal_mean(zones)
+    assert result.data[0, 0] == 1.5
+    assert result.data[1, 1] == 14 / 3
+    assert np.isnan(result.data[2]).all()
+
+
+def test_zonal_generic(grid_data, zone_grid_data):
+    result = grid_data.zonal(lambda a: np.percentile(a, 50), zone_grid_data)
+    assert result.md5 == grid_data.zonal_median(zone_grid_data).md5
+
+
+def test_zonal_empty_zone(grid_data, zone_grid_data):
+    g = grid_data.set_nan(zone_grid_data == 2)
+    for name in ("min", "max", "median", "mean", "std"):
+        result = getattr(g, f"zonal_{name}")(zone_grid_data)
+        assert np.isnan(result.data[zone_grid_data.data == 2]).all()
+        assert not np.isnan(result.data[zone_grid_data.data == 1]).any()